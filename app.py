@@ -1,18 +1,29 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+import os
 import time
 import re
 from datetime import datetime
 
+from engine.timing import TIMINGS, stage
+
+# Every stage of this rerun is timed into the shared TIMINGS (see Performance). The first
+# rerun of a session is also its start time: cold for the first one in this process.
+TIMINGS.start_run(session_start='started' not in st.session_state)
+st.session_state.started = True
+
+# Only light modules here: pandas, Plotly, pdfplumber and DuckDB are imported
+# by the views that need them, so the login page never waits for them
+from engine.cache import ParseCache, file_digest
+from engine.history import ACTIVITY_LOG, PAGE_SIZE, ChatHistory
+from engine.jobs import JOBS
+
 # -----------------------------------------------------------------------------
 # 1. CONFIGURATION
 # -----------------------------------------------------------------------------
-try:
-    import pdfplumber
-except ImportError:
-    # Fallback if library missing, though user should install it
-    pass
+# Images ship with the app, so nothing is fetched from the internet (air-gapped installs)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+LOGO = os.path.join(STATIC_DIR, "logo.svg")
+AVATAR = os.path.join(STATIC_DIR, "avatar.svg")
 
 st.set_page_config(
     page_title="Magic Bus Analytics Suite",
@@ -26,9 +37,11 @@ st.set_page_config(
 # -----------------------------------------------------------------------------
 st.markdown("""
     <style>
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600&display=swap');
-        
-        .stApp { background-color: #f8f9fa; font-family: 'Inter', sans-serif; }
+        /* Inter when installed, else the system UI font: no web font download */
+        .stApp {
+            background-color: #f8f9fa;
+            font-family: 'Inter', system-ui, -apple-system, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
+        }
         
         /* Sidebar */
         [data-testid="stSidebar"] {
@@ -89,8 +102,15 @@ st.markdown("""
 if 'auth' not in st.session_state: st.session_state.auth = False
 if 'user' not in st.session_state: 
     st.session_state.user = {"name": "Admin User", "role": "Head of Finance", "email": "admin@magicbus.org"}
-if 'messages' not in st.session_state: 
-    st.session_state.messages = [{"role": "assistant", "content": "Namaste! I am your Magic Bus AI. How can I help you today?"}]
+# Chat keeps a fixed window in memory; every turn is appended to the on-disk activity log
+if 'chat' not in st.session_state: 
+    st.session_state.chat = ChatHistory(user=st.session_state.user['email'],
+                                        greeting="Namaste! I am your Magic Bus AI. How can I help you today?")
+if 'chat_pages' not in st.session_state: st.session_state.chat_pages = 1
+# Datasets with appended batches, by the key of the upload they grew from (session-only)
+if 'appended' not in st.session_state: st.session_state.appended = {}
+# PDFs that could not be read completely, kept for this session (with the error shown) until retried
+if 'pdf_incomplete' not in st.session_state: st.session_state.pdf_incomplete = {}
 
 # --- NAVIGATION STATE FIX ---
 # Initialize navigation keys if they don't exist
@@ -106,6 +126,21 @@ def on_sys_nav_change():
     """When system nav is clicked, clear main nav"""
     st.session_state.nav_main = None
 
+def load_earlier_messages():
+    """Show one more page of chat history"""
+    st.session_state.chat_pages += 1
+
+def set_graph_flag(flag, fragment):
+    """Sidebar graph toggle: keep the flag and rerun only the dashboard fragment it controls"""
+    st.session_state[flag] = st.session_state[f"_{flag}"]
+    if st.session_state.get("dashboard_live"):
+        st.rerun(fragment)
+
+def on_projects_change():
+    """The project selection feeds the KPI row and every chart, but nothing else"""
+    if st.session_state.get("dashboard_live"):
+        st.rerun(["kpis", "charts", "trend"])
+
 # Graph Visibility Defaults
 if 'show_bar' not in st.session_state: st.session_state.show_bar = True
 if 'show_pie' not in st.session_state: st.session_state.show_pie = True
@@ -116,41 +151,233 @@ if 'sett_animations' not in st.session_state: st.session_state.sett_animations =
 if 'sett_darkmode' not in st.session_state: st.session_state.sett_darkmode = False
 if 'sett_notifications' not in st.session_state: st.session_state.sett_notifications = True
 if 'sett_autosave' not in st.session_state: st.session_state.sett_autosave = True
+# Fast mode drops the cosmetic delays (login spinner, typing effect)
+if 'sett_fast_mode' not in st.session_state: st.session_state.sett_fast_mode = os.environ.get("MB_FAST_MODE", "0") == "1"
+# Out-of-core engine: single ledgers are converted to Parquet and queried with DuckDB instead of held in RAM
+if 'sett_columnar' not in st.session_state: st.session_state.sett_columnar = os.environ.get("MB_COLUMNAR", "0") == "1"
 
 # -----------------------------------------------------------------------------
 # 4. INTELLIGENT HELPERS
 # -----------------------------------------------------------------------------
+def pause(seconds):
+    """Cosmetic delay, skipped in fast mode"""
+    if not st.session_state.sett_fast_mode:
+        time.sleep(seconds)
+
 def stream_text(text):
     """Typing effect"""
+    if st.session_state.sett_fast_mode:
+        yield text
+        return
     for char in text.split(" "):
         yield char + " "
         time.sleep(0.02)
 
-def auto_map_columns(df):
-    """Smartly detects Amount, Category, and Date columns"""
-    cols = list(df.columns)
-    
-    # 1. Amount
-    amt = next((c for c in cols if any(x in c.lower() for x in ['spend', 'amount', 'cost', 'total', 'budget'])), None)
-    if not amt: amt = df.select_dtypes(include=['number']).columns[0] if len(df.select_dtypes(include=['number']).columns)>0 else None
-    
-    # 2. Category
-    cat = next((c for c in cols if any(x in c.lower() for x in ['project', 'donor', 'name', 'activity'])), None)
-    if not cat: 
-        texts = df.select_dtypes(include=['object']).columns
-        for t in texts:
-            if 'status' not in t.lower() and 'date' not in t.lower():
-                cat = t
-                break
-    if not cat and len(cols)>0: cat = cols[0]
-    
-    # 3. Date
-    date = next((c for c in cols if any(x in c.lower() for x in ['date', 'time', 'year', 'month'])), None)
+@st.cache_resource
+def get_parse_cache():
+    """One parse cache for the whole server, shared by every session"""
+    return ParseCache(budget_mb=float(os.environ.get("MB_CACHE_BUDGET_MB", 512)))
+
+def load_in_background(key, label, parse, size):
+    """(dataset, job): the cached dataset for ``key``, or None plus the background job building it"""
+    cache = get_parse_cache()
+    dataset = cache.get(key)
+    if dataset is not None:
+        return dataset, None
+    job = JOBS.get(key)
+    if job is not None and job.state == "done" and job.result is not None:
+        return job.result, job  # larger than the cache budget, so the finished job still holds it
+    if job is None or job.state == "done":
+        def publish(result):
+            cache.put(key, result)
+            return key in cache
+        cache.count_miss()
+        job = JOBS.start(key, label, parse, publish=publish, bytes_total=size)
+    return None, job
+
+@st.fragment(run_every=0.5)
+def ingest_progress(job_key, pdf_docs):
+    """Live progress of background loading; reruns the whole app once the data has landed"""
+    job = JOBS.get(job_key) if job_key else None
+    reading = [d for d in pdf_docs if not d.done]
+    if (job is None or not job.running) and not reading:
+        st.rerun()
+    if job is not None and job.running:
+        p = job.progress.snapshot()
+        with st.status(f"📂 Loading {job.label}: {p['phase']}...", expanded=True):
+            st.progress(job.progress.fraction,
+                        text=f"{p['bytes_done'] / 1024 / 1024:,.1f} / {p['bytes_total'] / 1024 / 1024:,.1f} MB read · "
+                             f"{p['rows']:,} rows parsed · {p['seconds']:.1f}s")
+            if st.button("✖ Cancel Loading", key=f"cancel_{job_key}"):
+                job.cancel()
+    for d in reading:
+        st.progress(d.pages_ready / max(1, len(d)), text=f"📄 {d.name}: {d.pages_ready:,} / {len(d):,} pages extracted")
+        if not d.cancelled and st.button(f"✖ Stop Reading {d.name}", key=f"cancel_pdf_{d.digest}"):
+            d.cancel()
+
+def columnar_engine():
+    """engine.columnar if DuckDB is installed, else None (imported on first use)"""
+    from engine import columnar
+    return columnar if columnar.available() else None
+
+def upload_digest(uploaded_file):
+    """Hash the upload once per file and remember it for later reruns"""
+    key = f"digest_{getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)}"
+    if key not in st.session_state:
+        st.session_state[key] = file_digest(uploaded_file.getvalue())
+    return st.session_state[key]
+
+# --- 4b. VIEW FRAGMENTS ---
+# Each region reruns on its own when one of its widgets changes; the full app
+# (upload, mapping, CSS, other views) reruns only for navigation and new data.
+# Arguments are the cached dataset handles from the last full run.
+@st.fragment(key="kpis")
+def kpi_row(cube):
+    """Total / average / max / count for the selected projects"""
+    with TIMINGS.fragment("kpis"):
+        sel_cats = st.session_state.get("sel_cats")
+        with stage("aggregation"):
+            kpi = cube.kpis(sel_cats)
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Total Spend", f"₹ {kpi['total']:,.0f}")
+        k2.metric("Avg Transaction", f"₹ {kpi['mean']:,.0f}")
+        k3.metric("Max Project", f"₹ {kpi['max']:,.0f}")
+        k4.metric("Records Found", kpi['records'])
+
+@st.fragment(key="charts")
+def comparison_charts(cube):
+    """Top-10 bar and allocation pie for the selected projects"""
+    with TIMINGS.fragment("charts"):
+        amt, cat, sel_cats = cube.amt, cube.cat, st.session_state.get("sel_cats")
+        if st.session_state.show_bar or st.session_state.show_pie:
+            c1, c2 = st.columns(2)
+            if st.session_state.show_bar:
+                with c1 if st.session_state.show_pie else st.container():
+                    st.subheader(f"📊 Spend by {cat}")
+                    with stage("aggregation"): df_agg = cube.top(sel_cats, 10)
+                    with stage("chart"):
+                        import plotly.express as px
+                        fig1 = px.bar(df_agg, x=amt, y=cat, orientation='h', text_auto='.2s', 
+                                      color=amt, color_continuous_scale=['#ffcdd2', '#b71c1c'])
+                        st.plotly_chart(fig1, use_container_width=True)
+            
+            if st.session_state.show_pie:
+                with c2 if st.session_state.show_bar else st.container():
+                    st.subheader("🍩 Budget Allocation")
+                    with stage("aggregation"):
+                        from engine.charts import allocation
+                        df_pie = allocation(cube, sel_cats)
+                    with stage("chart"):
+                        import plotly.express as px
+                        fig2 = px.pie(df_pie, names=cat, values=amt, hole=0.6, color_discrete_sequence=px.colors.qualitative.Bold)
+                        st.plotly_chart(fig2, use_container_width=True)
+
+@st.fragment(key="trend")
+def trend_chart(cube):
+    """Spend over time for the selected projects; the bucket radio reruns only this chart"""
+    with TIMINGS.fragment("trend"):
+        amt, date, sel_cats = cube.amt, cube.date, st.session_state.get("sel_cats")
+        if date and st.session_state.show_line:
+            from engine.charts import BUCKETS, trend
+            st.subheader("📅 Time Trends")
+            bucket = st.radio("Group trend by", list(BUCKETS), index=2, horizontal=True, key="trend_bucket")
+            # Resampled server-side and downsampled above the point budget
+            with stage("aggregation"): df_time = trend(cube, sel_cats, bucket)
+            if df_time is not None and not df_time.empty:
+                with stage("chart"):
+                    import plotly.express as px
+                    fig3 = px.line(df_time, x=date, y=amt, markers=len(df_time) <= 200)
+                    fig3.update_traces(line_color='#D32F2F', line_width=3)
+                    st.plotly_chart(fig3, use_container_width=True)
+            else: st.info("Date formatting issue.")
+
+@st.fragment(key="preview")
+def preview_grid(dataset):
+    """Filters, paged grid and export of the Data Preview"""
+    with TIMINGS.fragment("preview"):
+        from engine.preview import EXPORT_FORMATS, export_file, filter_positions, filter_values, n_rows, page
+        from engine.workspace import SOURCE_COL
+        cat, status = dataset.cat, dataset.status
+        c1, c2, c3, c4 = st.columns(4)
+        f_cat, f_status = "All", "All"
+        
+        # Filters are lookups in prebuilt value -> row-position maps; nothing is copied
+        if cat:
+            with c1: f_cat = st.selectbox(f"Filter by {cat}", ["All"] + filter_values(dataset, cat))
+        if status:
+            with c2: f_status = st.selectbox("Filter by Status", ["All"] + filter_values(dataset, status))
+        f_source = "All"
+        if dataset.sources:
+            with c3: f_source = st.selectbox("Filter by Source", ["All"] + filter_values(dataset, SOURCE_COL))
+        with c4: page_size = st.selectbox("Rows per page", [50, 100, 500, 1000], index=1)
+        
+        filters = {}
+        if f_cat != "All": filters[cat] = f_cat
+        if status and f_status != "All": filters[status] = f_status
+        if f_source != "All": filters[SOURCE_COL] = f_source
+        with stage("filtering"):
+            positions = filter_positions(dataset, filters)
+            total = n_rows(dataset, positions)
+        
+        pages = max(1, -(-total // page_size))
+        page_no = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, step=1)
+        with stage("filtering"): rows = page(dataset, positions, page_no - 1, page_size)
+        st.dataframe(rows, use_container_width=True)
+        first = (page_no - 1) * page_size
+        st.caption(f"Showing {min(first + 1, total):,}–{min(first + page_size, total):,} of {total:,} records")
+        if dataset.report is not None:
+            st.caption(f"⚡ Ingested {dataset.report}")
+        for b in dataset.batches:
+            st.caption(f"➕ Appended {b}")
+        if dataset.sources:
+            st.caption("🗂️ Sources: " + " · ".join(f"{label} ({rows:,} rows, {secs:.2f}s)" for label, rows, secs in dataset.sources)
+                       + (f" · skipped: {', '.join(dataset.skipped)}" if dataset.skipped else ""))
+        
+        # Export is generated only when the button is clicked, in chunks, into a spooled temp file
+        e1, e2 = st.columns([1, 3])
+        with e1: fmt = st.selectbox("Export format", list(EXPORT_FORMATS), label_visibility="collapsed")
+        with e2:
+            file_name, mime = EXPORT_FORMATS[fmt]
+            st.download_button("📥 Download Filtered Data", lambda: export_file(dataset, positions, fmt), file_name, mime)
+
+@st.fragment(key="chat")
+def chat_panel(dataset, pdf_docs):
+    """Chat history page and input of the AI Analyst"""
+    with TIMINGS.fragment("chat"):
+        # Only the newest pages are rendered; earlier turns are read back from the log on request
+        chat = st.session_state.chat
+        shown = PAGE_SIZE * st.session_state.chat_pages
+        if len(chat) > shown:
+            st.button(f"⬆️ Load earlier messages ({len(chat) - shown} more)", on_click=load_earlier_messages)
+        else:
+            st.chat_message("assistant").write(chat.greeting)
+        for msg in chat.last(shown):
+            with st.chat_message(msg["role"]):
+                st.write(msg["content"])
     
-    # 4. Status
-    status = next((c for c in cols if 'status' in c.lower()), None)
+        prompt = st.chat_input("Ask: 'Total Spend', 'Top 5 Projects', 'Spend by Donor in 2024'...")
     
-    return amt, cat, date, status
+        if prompt:
+            st.chat_message("user").write(prompt)
+            chat.append("user", prompt)
+        
+            resp = ""
+        
+            with stage("answer"):
+                if dataset is not None and dataset.amt:
+                    # Parsed into a query plan, run vectorised and memoised per dataset
+                    from engine.query import answer
+                    resp = answer(dataset, prompt)
+                elif pdf_docs:
+                    # Summary from the first pages, otherwise a ranked search across every PDF
+                    from engine.pdf import answer as pdf_answer
+                    resp = pdf_answer(pdf_docs, prompt)
+                else:
+                    resp = "Please upload a file first."
+        
+            with st.chat_message("assistant"):
+                st.write_stream(stream_text(resp))
+            chat.append("assistant", resp)
 
 # -----------------------------------------------------------------------------
 # 5. LOGIN SCREEN
@@ -180,7 +407,7 @@ def login_page():
             if btn:
                 if u == "admin" and p == "admin":
                     with st.spinner("Verifying credentials..."):
-                        time.sleep(1) 
+                        pause(1)
                     st.session_state.auth = True
                     st.rerun()
                 else:
@@ -202,7 +429,7 @@ if not st.session_state.auth:
 else:
     # --- SIDEBAR ---
     with st.sidebar:
-        st.image("https://upload.wikimedia.org/wikipedia/commons/thumb/3/3e/Magic_Bus_logo.png/640px-Magic_Bus_logo.png", width=140)
+        st.image(LOGO, width=140)
         st.markdown(f"### 👤 {st.session_state.user['name']}")
         st.caption(st.session_state.user['role'])
         st.markdown("---")
@@ -225,7 +452,7 @@ else:
         st.markdown("### ⚙️ System")
         nav_sys_selection = st.radio(
             "Settings", 
-            ["Profile", "Preferences"], 
+            ["Profile", "Preferences", "Performance"], 
             label_visibility="collapsed", 
             key="nav_sys",
             on_change=on_sys_nav_change,
@@ -245,12 +472,24 @@ else:
         if active_view == "📊 Dashboard":
             st.markdown("---")
             st.markdown("### 👁️ Graph Controls")
-            st.session_state.show_bar = st.checkbox("Show Comparison", value=st.session_state.show_bar)
-            st.session_state.show_pie = st.checkbox("Show Allocation", value=st.session_state.show_pie)
-            st.session_state.show_line = st.checkbox("Show Trends", value=st.session_state.show_line)
+            # Each toggle reruns only the chart fragment it controls (see set_graph_flag)
+            st.checkbox("Show Comparison", value=st.session_state.show_bar, key="_show_bar",
+                        on_change=set_graph_flag, args=("show_bar", "charts"))
+            st.checkbox("Show Allocation", value=st.session_state.show_pie, key="_show_pie",
+                        on_change=set_graph_flag, args=("show_pie", "charts"))
+            st.checkbox("Show Trends", value=st.session_state.show_line, key="_show_line",
+                        on_change=set_graph_flag, args=("show_line", "trend"))
 
         st.markdown("---")
-        uploaded_file = st.file_uploader("📥 Upload Data", type=['csv', 'xlsx', 'pdf'])
+        workspace_mode = st.toggle("🗂️ Workspace Mode", key="workspace_mode",
+                                   help="Load several files at once, with every sheet of each workbook.")
+        uploads = st.file_uploader("📥 Upload Data", type=['csv', 'xlsx', 'pdf'], accept_multiple_files=workspace_mode)
+        if not workspace_mode: uploads = [uploads] if uploads else []
+        append_mode = st.toggle("➕ Append Mode", key="append_mode",
+                                help="Add a new batch (e.g. this month's transactions) to the loaded ledger. "
+                                     "Rows whose key is already loaded are skipped.")
+        # Filled in once the ledger is loaded, since the key choices depend on its columns
+        append_box = st.container() if append_mode else None
         
         if st.button("Logout"):
             st.session_state.auth = False
@@ -260,6 +499,7 @@ else:
     header_title = "Magic Bus Intelligence Hub"
     if active_view == "Profile": header_title = "User Profile"
     elif active_view == "Preferences": header_title = "System Preferences"
+    elif active_view == "Performance": header_title = "Performance Monitor"
     
     st.markdown(f"""
         <div class="dashboard-header">
@@ -268,85 +508,110 @@ else:
         </div>
     """, unsafe_allow_html=True)
 
-    # GLOBAL DATA LOAD WITH SCANNING
-    df = None
-    pdf_text = ""
+    # GLOBAL DATA LOAD (parsing runs in the background; see ingest_progress)
+    dataset = None
+    job = None
+    pdf_docs = []
     amt, cat, date, status = None, None, None, None
 
-    if uploaded_file:
-        file_key = f"scanned_{uploaded_file.name}"
-        if file_key not in st.session_state:
-            with st.status("📂 File Uploaded! Scanning for viruses & data integrity...", expanded=True) as status_box:
-                st.write("🔍 Analyzing file structure...")
-                time.sleep(1)
-                st.write("🛡️ Running security checks...")
-                time.sleep(0.8)
-                st.write("✅ Mapping data columns...")
-                time.sleep(0.5)
-                status_box.update(label="✅ Scan Complete! Data Ready.", state="complete", expanded=False)
-            st.session_state[file_key] = True
-
+    if uploads:
         try:
-            if uploaded_file.name.endswith('.pdf'):
-                # Safety check for pdfplumber
-                try:
-                    import pdfplumber
-                    with pdfplumber.open(uploaded_file) as pdf:
-                        for p in pdf.pages: pdf_text += p.extract_text() + "\n"
-                except ImportError:
-                    st.error("PDF support requires 'pdfplumber'. Please install it.")
-            else:
-                if uploaded_file.name.endswith('.csv'): df = pd.read_csv(uploaded_file)
-                else: df = pd.read_excel(uploaded_file)
-                amt, cat, date, status = auto_map_columns(df)
+            with stage("ingest"):
+                pdfs = [f for f in uploads if f.name.endswith('.pdf')]
+                tables = [f for f in uploads if not f.name.endswith('.pdf')]
+                if pdfs:
+                    # Safety check for pdfplumber
+                    try:
+                        from engine.pdf import PdfDocument
+                        # Pages are extracted in the background; views read them lazily
+                        for f in pdfs:
+                            pdf_docs.append(st.session_state.pdf_incomplete.get(upload_digest(f)) or get_parse_cache().get_or_parse(
+                                upload_digest(f), lambda f=f: PdfDocument(f.getvalue(), upload_digest(f), f.name)))
+                    except ImportError:
+                        st.error("PDF support requires 'pdfplumber'. Please install it.")
+                if workspace_mode and tables:
+                    # Every file and sheet is parsed concurrently and aligned into one dataset
+                    from engine.workspace import load_workspace, workspace_digest
+                    key = workspace_digest([upload_digest(f) for f in tables])
+                    label = f"{len(tables)} file{'s' if len(tables) != 1 else ''}"
+                    parse = lambda progress, key=key, files=tables: load_workspace(
+                        [(f.name, f.getvalue()) for f in files], key, progress)
+                elif tables and st.session_state.sett_columnar and columnar_engine() is not None:
+                    digest, label = upload_digest(tables[0]), tables[0].name
+                    key = f"columnar:{digest}"
+                    parse = lambda progress, digest=digest, f=tables[0]: columnar_engine().load_columnar(
+                        f.name, f.getvalue(), digest, progress)
+                elif tables:
+                    from engine.ingest import load_table
+                    key, label = upload_digest(tables[0]), tables[0].name
+                    parse = lambda progress, key=key, f=tables[0]: load_table(f.name, f.getvalue(), key, progress)
+                if tables:
+                    # The parse runs on a background job; until it finishes the previous dataset stays on screen
+                    dataset, job = load_in_background(key, label, parse, sum(f.size for f in tables))
+                    if dataset is not None:
+                        st.session_state.dataset_key = key
+                    elif st.session_state.get("dataset_key"):
+                        dataset = get_parse_cache().get(st.session_state.dataset_key)
+                base_key = st.session_state.get("dataset_key")
+                if dataset is not None and base_key in st.session_state.appended:
+                    dataset = st.session_state.appended[base_key]
+                if dataset is not None and append_box is not None:
+                    with append_box:
+                        if dataset.columnar:
+                            st.caption("Append Mode needs the in-memory engine.")
+                        else:
+                            from engine.append import SchemaMismatch, append_batch, default_key
+                            key_cols = st.multiselect("Dedupe Key", dataset.columns, default=default_key(dataset),
+                                                      key="append_key", help="Empty: whole rows are compared.")
+                            batch = st.file_uploader("📥 Append Batch", type=['csv', 'xlsx'], key="append_upload")
+                            if batch is not None and upload_digest(batch) not in {b.digest for b in dataset.batches}:
+                                try:
+                                    # Only the batch is parsed; totals and the key set are updated incrementally
+                                    dataset, report = append_batch(dataset, batch.name, batch.getvalue(),
+                                                                   upload_digest(batch), key_cols)
+                                    st.session_state.appended[base_key] = dataset
+                                    st.toast(f"Appended {report}", icon="➕")
+                                except SchemaMismatch as e:
+                                    st.error(f"Batch rejected: {e}")
+                if dataset is not None:
+                    amt, cat, date, status = dataset.mapping
         except Exception as e: st.error(f"File Error: {e}")
 
+        if (job is not None and job.running) or any(not d.done for d in pdf_docs):
+            ingest_progress(job.key if job is not None else None, pdf_docs)
+        elif job is not None and job.state in ("failed", "cancelled"):
+            if job.state == "failed": st.error(f"File Error: {job.error}")
+            else: st.warning(f"Loading {job.label} was cancelled.")
+            if st.button("🔄 Retry Loading"):
+                JOBS.discard(job.key)
+                st.rerun()
+        for d in pdf_docs:
+            if d.done and d.failed:
+                st.session_state.pdf_incomplete[d.digest] = d
+                st.error(f"📄 {d.name}: {len(d.failed)} of {len(d)} pages could not be read ({d.error})")
+                if st.button(f"🔄 Retry Reading {d.name}", key=f"retry_pdf_{d.digest}"):
+                    st.session_state.pdf_incomplete.pop(d.digest, None)
+                    st.rerun()
+
+    # Views render through fragments (section 4b): a widget inside one reruns only that region
+    st.session_state.dashboard_live = False
+
     # =========================================================
     # VIEW 1: DASHBOARD
     # =========================================================
     if active_view == "📊 Dashboard":
-        if df is not None and amt:
+        if dataset is not None and amt:
             st.markdown("##### 🔍 Project Comparison")
-            all_cats = list(df[cat].unique())
-            sel_cats = st.multiselect("Select Projects to Compare", all_cats, default=[])
-            
-            df_view = df[df[cat].isin(sel_cats)] if sel_cats else df
-            
-            k1, k2, k3, k4 = st.columns(4)
-            k1.metric("Total Spend", f"₹ {df_view[amt].sum():,.0f}")
-            k2.metric("Avg Transaction", f"₹ {df_view[amt].mean():,.0f}")
-            k3.metric("Max Project", f"₹ {df_view[amt].max():,.0f}")
-            k4.metric("Records Found", len(df_view))
-            
+            cube = dataset.cube
+            st.multiselect("Select Projects to Compare", list(cube.categories), default=[], key="sel_cats",
+                           on_change=on_projects_change)
+            kpi_row(cube)
             st.markdown("---")
+            comparison_charts(cube)
+            trend_chart(cube)
+            st.session_state.dashboard_live = True
             
-            if st.session_state.show_bar or st.session_state.show_pie:
-                c1, c2 = st.columns(2)
-                if st.session_state.show_bar:
-                    with c1 if st.session_state.show_pie else st.container():
-                        st.subheader(f"📊 Spend by {cat}")
-                        df_agg = df_view.groupby(cat)[amt].sum().reset_index().sort_values(by=amt, ascending=True).tail(10)
-                        fig1 = px.bar(df_agg, x=amt, y=cat, orientation='h', text_auto='.2s', 
-                                      color=amt, color_continuous_scale=['#ffcdd2', '#b71c1c'])
-                        st.plotly_chart(fig1, use_container_width=True)
-                
-                if st.session_state.show_pie:
-                    with c2 if st.session_state.show_bar else st.container():
-                        st.subheader("🍩 Budget Allocation")
-                        fig2 = px.pie(df_view, names=cat, values=amt, hole=0.6, color_discrete_sequence=px.colors.qualitative.Bold)
-                        st.plotly_chart(fig2, use_container_width=True)
-            
-            if date and st.session_state.show_line:
-                st.subheader("📅 Time Trends")
-                try:
-                    df_view[date] = pd.to_datetime(df_view[date])
-                    df_time = df_view.groupby(date)[amt].sum().reset_index()
-                    fig3 = px.line(df_time, x=date, y=amt, markers=True)
-                    fig3.update_traces(line_color='#D32F2F', line_width=3)
-                    st.plotly_chart(fig3, use_container_width=True)
-                except: st.info("Date formatting issue.")
-            
-        elif pdf_text:
+        elif pdf_docs:
             st.info("PDF Loaded. Switch to 'AI Analyst' tab.")
         else:
             st.info("👈 Upload a file to view Dashboard.")
@@ -357,24 +622,8 @@ else:
     elif active_view == "📂 Data Preview":
         st.markdown("### 🛠️ Data Explorer")
         
-        if df is not None:
-            c1, c2, c3 = st.columns(3)
-            f_cat, f_status = "All", "All"
-            
-            if cat:
-                with c1: f_cat = st.selectbox(f"Filter by {cat}", ["All"] + list(df[cat].unique()))
-            if status:
-                with c2: f_status = st.selectbox("Filter by Status", ["All"] + list(df[status].unique()))
-            
-            df_f = df.copy()
-            if f_cat != "All": df_f = df_f[df_f[cat] == f_cat]
-            if status and f_status != "All": df_f = df_f[df_f[status] == f_status]
-            
-            st.dataframe(df_f, use_container_width=True)
-            st.caption(f"Showing {len(df_f)} records")
-            
-            csv = df_f.to_csv(index=False).encode('utf-8')
-            st.download_button("📥 Download Filtered Data", csv, "magic_bus_data.csv", "text/csv")
+        if dataset is not None:
+            preview_grid(dataset)
         else:
             st.info("Upload data first.")
 
@@ -384,47 +633,7 @@ else:
     elif active_view == "🤖 AI Analyst":
         st.markdown("### 💬 Ask the Intelligent Agent")
         
-        for msg in st.session_state.messages:
-            with st.chat_message(msg["role"]):
-                st.write(msg["content"])
-        
-        prompt = st.chat_input("Ask: 'Total Spend', 'Highest Project', 'Summary'...")
-        
-        if prompt:
-            st.chat_message("user").write(prompt)
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            
-            q = prompt.lower()
-            resp = ""
-            
-            if df is not None and amt:
-                if any(x in q for x in ["hi", "hello", "namaste"]): 
-                    resp = "Hello! I am your Magic Bus Financial Assistant."
-                elif any(x in q for x in ["total", "sum", "spend"]): 
-                    resp = f"💰 **Total Volume:** ₹ {df[amt].sum():,.2f}"
-                elif any(x in q for x in ["max", "highest", "top"]): 
-                    row = df.nlargest(1, amt).iloc[0]
-                    resp = f"🏆 **Highest:** {row[cat]} (**₹ {row[amt]:,.2f}**)"
-                elif any(x in q for x in ["min", "lowest", "least"]): 
-                    row = df.nsmallest(1, amt).iloc[0]
-                    resp = f"📉 **Lowest:** {row[cat]} (**₹ {row[amt]:,.2f}**)"
-                elif "summary" in q:
-                    resp = f"**Summary:** Analyzed {len(df)} records. Total Spend: ₹ {df[amt].sum():,.2f}."
-                elif "compare" in q:
-                    resp = "You can use the 'Dashboard' tab filters to compare projects visually!"
-                else:
-                    resp = "I can answer: Total, Max, Min, Summary. Try asking: 'Total Spend'."
-            elif pdf_text:
-                if "summary" in q: resp = f"**PDF Summary:**\n{pdf_text[:600]}..."
-                else: 
-                    matches = [l for l in pdf_text.split('\n') if q in l.lower()]
-                    resp = "Found:\n" + "\n".join(matches[:3]) if matches else "No text match found."
-            else:
-                resp = "Please upload a file first."
-            
-            with st.chat_message("assistant"):
-                st.write_stream(stream_text(resp))
-            st.session_state.messages.append({"role": "assistant", "content": resp})
+        chat_panel(dataset, pdf_docs)
 
     # =========================================================
     # VIEW 4: PROFILE
@@ -432,7 +641,7 @@ else:
     elif active_view == "Profile":
         st.markdown("### 👤 User Profile")
         c1, c2 = st.columns([1, 3])
-        with c1: st.image("https://cdn-icons-png.flaticon.com/512/3135/3135715.png", width=150)
+        with c1: st.image(AVATAR, width=150)
         with c2:
             st.subheader(st.session_state.user['name'])
             st.write(f"**Role:** {st.session_state.user['role']}")
@@ -455,6 +664,8 @@ else:
             st.session_state.sett_darkmode = st.toggle("🌙 Enable Dark Mode Theme", value=st.session_state.sett_darkmode)
             st.session_state.sett_animations = st.toggle("✨ Enable Graph Animations", value=st.session_state.sett_animations)
             
+            st.session_state.sett_fast_mode = st.toggle("⚡ Fast Mode (skip loading animations)", value=st.session_state.sett_fast_mode)
+            
             if st.session_state.sett_darkmode:
                 st.info("Note: Dark Mode will apply on next system restart.")
             
@@ -466,11 +677,52 @@ else:
             with c2:
                 if st.button("🗑️ Clear Cache Now", use_container_width=True):
                     st.cache_data.clear()
+                    get_parse_cache().clear()
+                    from engine.pdf import PAGE_CACHE
+                    PAGE_CACHE.clear()
                     st.toast("Cache Cleared Successfully!", icon="🧹")
                 
-                if st.button("📥 Export Activity Logs", use_container_width=True):
-                    st.toast("Logs exported to admin folder.", icon="📂")
+                st.download_button("📥 Export Activity Logs", ACTIVITY_LOG.export, "activity_log.jsonl",
+                                   "application/x-ndjson", use_container_width=True)
+            
+            cache = get_parse_cache()
+            budget = st.number_input("Parse Cache Budget (MB)", min_value=16, max_value=65536,
+                                     value=int(cache.budget / 1024 / 1024), step=64)
+            if budget * 1024 * 1024 != cache.budget: cache.set_budget(budget)
+            cs = cache.stats()
+            st.caption(f"Parse cache: {cs['entries']} file(s), {cs['used_mb']:,.1f} / {cs['budget_mb']:,.0f} MB · "
+                       f"{cs['hits']} hits / {cs['misses']} misses ({cs['hit_rate']:.0%}) · {cs['evictions']} evicted")
+            st.session_state.sett_columnar = st.toggle(
+                "🧱 Out-of-core engine (Parquet + DuckDB)", value=st.session_state.sett_columnar,
+                disabled=columnar_engine() is None,
+                help="Single-file ledgers are converted to Parquet on disk once and every view is answered by a "
+                     "DuckDB scan, so files larger than RAM stay usable. Workspace mode keeps data in memory.")
             
         with st.expander("🛠️ Model Config"):
             conf = st.slider("AI Confidence Threshold", 0.5, 1.0, 0.85)
-            st.caption(f"Current Threshold: {conf*100}% accuracy required")
\ No newline at end of file
+            st.caption(f"Current Threshold: {conf*100}% accuracy required")
+
+    # =========================================================
+    # VIEW 6: PERFORMANCE (admin)
+    # =========================================================
+    elif active_view == "Performance":
+        st.markdown("### ⏱️ Rerun Latency")
+        rows = TIMINGS.summary()
+        if rows:
+            import pandas as pd
+            st.dataframe(pd.DataFrame(rows).set_index("stage").round(1), use_container_width=True)
+            st.caption(f"Per-rerun totals of each stage over the last {TIMINGS.window} reruns that used it · "
+                       f"{len(TIMINGS):,} reruns logged. Stages nest (mapping runs inside ingest).")
+        else:
+            st.info("No reruns timed yet.")
+        c1, c2 = st.columns(2)
+        with c1:
+            st.download_button("📥 Export Timings (JSON lines)", TIMINGS.jsonl, "magic_bus_timings.jsonl",
+                               "application/x-ndjson", use_container_width=True)
+        with c2:
+            if st.button("🗑️ Reset Timings", use_container_width=True):
+                TIMINGS.clear()
+                st.rerun()
+
+TIMINGS.finish_run(view=st.session_state.get("nav_sys") or st.session_state.get("nav_main"),
+                   auth=bool(st.session_state.auth))
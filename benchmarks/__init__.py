@@ -0,0 +1 @@
+"""Headless benchmarks for the engine: synthetic data plus a timed, memory-profiled run."""
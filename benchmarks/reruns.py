@@ -0,0 +1,161 @@
+"""Measure what fragment-scoped reruns save on a large ledger.
+
+    python -m benchmarks.reruns                   # 1m-row ledger, 5 repeats
+    python -m benchmarks.reruns --rows 5m --repeat 10 --json reruns.json
+
+Drives ``app.py`` headlessly with Streamlit's AppTest (the upload widget is
+replaced by the generated ledger) and, for each interaction, compares the
+script time of a full-app rerun (what every interaction cost before the views
+were split into fragments) with the time of the fragment(s) the interaction
+now reruns. Both numbers come from the app's own stage timings, so they
+exclude AppTest and browser overhead. Interactions wired to named fragments
+(graph toggles, project selection) run as real fragment-only reruns; AppTest
+reruns the whole script for widgets inside a fragment, so for those the
+fragment's stage within that run is used.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.synth import parse_size, write_ledger_csv
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+REPEAT = 5
+
+
+class _Upload(io.BytesIO):
+    """Stands in for st.file_uploader's UploadedFile"""
+
+    def __init__(self, path, data):
+        super().__init__(data)
+        self.name = os.path.basename(path)
+        self.size = len(data)
+        self.file_id = f"bench-{self.name}-{self.size}"
+
+
+def _fake_uploader(path):
+    import streamlit as st
+    with open(path, "rb") as f:
+        data = f.read()
+
+    def file_uploader(*args, **kwargs):
+        if kwargs.get("key") == "append_upload":
+            return None
+        upload = _Upload(path, data)
+        return [upload] if kwargs.get("accept_multiple_files") else upload
+    st.file_uploader = st.sidebar.file_uploader = file_uploader
+
+
+def _entries(timings, since):
+    """Rerun log entries recorded after the first ``since``"""
+    return [json.loads(line) for line in timings.jsonl().splitlines()[since:]]
+
+
+def _fragment_ms(entries, fragments):
+    """Script time of ``fragments``: fragment-only runs if there were any, else their stages in the full run"""
+    own = [e for e in entries if "fragment" in e]
+    if own:
+        return sum(e["ms"][f"fragment:{e['fragment']}"] for e in own if e["fragment"] in fragments)
+    return sum(e["ms"].get(f"fragment:{f}", 0.0) for e in entries for f in fragments)
+
+
+def _full_ms(entries):
+    return sum(e["ms"]["rerun"] for e in entries if "rerun" in e["ms"])
+
+
+def run(path, repeat=REPEAT):
+    """{interaction: {'full_ms': p50, 'fragment_ms': p50, 'fragments': [...]}}"""
+    from streamlit.testing.v1 import AppTest
+    from engine.jobs import JOBS
+    from engine.timing import TIMINGS
+
+    _fake_uploader(path)
+    at = AppTest.from_file(APP, default_timeout=600)
+    at.session_state.auth = True
+    at.run()
+    for job in JOBS.running():
+        job.wait()
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    cats = list(at.multiselect(key="sel_cats").options)
+
+    def measure(act, fragments, navigate=None):
+        full, frag = [], []
+        for i in range(repeat):
+            if navigate:
+                navigate()
+            since = len(TIMINGS)
+            act(i)
+            entries = _entries(TIMINGS, since)
+            frag.append(_fragment_ms(entries, fragments))
+            if any("fragment" in e for e in entries):
+                # The interaction reran only fragments; a full rerun with the same state is the old cost
+                since = len(TIMINGS)
+                at.run()
+                entries = _entries(TIMINGS, since)
+            full.append(_full_ms(entries))
+        return {"full_ms": float(np.median(full)), "fragment_ms": float(np.median(frag)), "fragments": fragments}
+
+    def dashboard():
+        at.session_state.nav_sys = None
+        at.session_state.nav_main = "📊 Dashboard"
+        at.run()
+
+    def preview():
+        at.session_state.nav_main = "📂 Data Preview"
+        at.run()
+
+    def analyst():
+        at.session_state.nav_main = "🤖 AI Analyst"
+        at.run()
+
+    results = {
+        "graph toggle": measure(lambda i: at.sidebar.checkbox(key="_show_bar").set_value(i % 2 == 1).run(),
+                                ["charts"], dashboard),
+        "project selection": measure(lambda i: at.multiselect(key="sel_cats").set_value(cats[i:i + 3]).run(),
+                                     ["kpis", "charts", "trend"], dashboard),
+        "trend bucket": measure(lambda i: at.radio(key="trend_bucket").set_value(
+            at.radio(key="trend_bucket").options[i % 2]).run(), ["trend"], dashboard),
+        "preview page": measure(lambda i: at.number_input[0].set_value(i + 2).run(), ["preview"], preview),
+        "chat message": measure(lambda i: at.chat_input[0].set_value("spend by donor").run(), ["chat"], analyst),
+    }
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--rows", default="1m", help="ledger size, e.g. 100k, 1m, 5m")
+    ap.add_argument("--repeat", type=int, default=REPEAT, help="times each interaction is measured (median kept)")
+    ap.add_argument("--json", help="also write the results to this file")
+    ap.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "mb-bench"),
+                    help="where generated inputs are kept between runs")
+    args = ap.parse_args(argv)
+
+    # Cosmetic delays would swamp the numbers
+    os.environ["MB_FAST_MODE"] = "1"
+    n = parse_size(args.rows)
+    os.makedirs(args.workdir, exist_ok=True)
+    path = os.path.join(args.workdir, f"ledger_{n}.csv")
+    if not os.path.exists(path):
+        write_ledger_csv(path, n)
+
+    results = run(path, args.repeat)
+    print(f"{'interaction':<20} {'full rerun':>12} {'fragments':>12} {'speedup':>9}   reruns")
+    for name, r in results.items():
+        speedup = r["full_ms"] / r["fragment_ms"] if r["fragment_ms"] else float("inf")
+        print(f"{name:<20} {r['full_ms']:>9.1f} ms {r['fragment_ms']:>9.1f} ms {speedup:>8.1f}×   "
+              f"{', '.join(r['fragments'])}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rows": n, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""Run the engine stages headlessly on synthetic data and compare against a baseline.
+
+    python -m benchmarks.run                          # 10k and 100k rows, 100-page PDF
+    python -m benchmarks.run --rows 10k,1m,10m --pages 500 --no-memory
+    python -m benchmarks.run --update-baseline        # record the current numbers
+
+Each stage is timed on fresh state (best of a few runs for fast stages) and
+then run once more under tracemalloc for the Python-heap high-water mark
+(numpy/pandas buffers included; PDF pages extracted in worker processes are
+not). A stage fails
+when it is slower or larger than the stored baseline by more than
+``--tolerance`` (plus a small absolute slack so sub-millisecond stages do not
+flap). The exit status is 1 on any regression, so CI can gate on it.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synth import parse_size, write_ledger_csv, write_pdf
+from engine import query, schema
+from engine.cache import file_digest
+from engine.charts import allocation, trend
+from engine.dataset import Dataset
+from engine.ingest import read_table
+from engine.pdf import PAGE_CACHE, PdfDocument, answer as pdf_answer
+from engine.preview import export_file, filter_positions, page
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+TOLERANCE = 1.5
+SLACK_SECONDS = 0.05
+SLACK_MB = 2.0
+REPEAT = 5
+TIME_BUDGET = 1.0
+QUESTIONS = ["total spend", "average spend", "highest project", "how many records", "summary",
+             "spend by donor", "top 5 projects in 2023", "spend per month", "total spend for tata trust",
+             "spend by region in 2024", "pending count by donor"]
+PDF_QUESTIONS = ["tata trust grant utilisation", "mentoring sessions in ranchi", "girls football league children",
+                 "audit observations closed", "summary"]
+
+
+def measure(stage, memory=True):
+    """(seconds, peak_mb) of one stage (peak_mb is None without memory).
+
+    Fast stages are repeated up to REPEAT times within TIME_BUDGET seconds and
+    the best time is kept, which damps scheduler noise on millisecond stages.
+    """
+    times, spent = [], 0.0
+    while not times or (len(times) < REPEAT and spent < TIME_BUDGET):
+        t0 = time.perf_counter()
+        stage()
+        times.append(time.perf_counter() - t0)
+        spent += times[-1]
+    seconds = min(times)
+    if not memory:
+        return seconds, None
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak / 1024 / 1024
+
+
+def _fresh(df, mapping):
+    """A new Dataset over an already parsed frame, with no derived structures or memoised answers"""
+    query._memo.clear()
+    return Dataset(df, mapping, digest=None, name="bench")
+
+
+def ledger_stages(data):
+    """Stages for one ledger size, sharing the parsed frame between them"""
+    df, mapping, _ = read_table("ledger.csv", data)
+    ds = _fresh(df, mapping)
+    ds.cube
+    top_cats = list(ds.cube.top(None, 3)[ds.cat])
+
+    def schema_stage():
+        schema._memo.clear()
+        schema.auto_map_columns(df)
+
+    def dashboard():
+        for sel in (None, top_cats):
+            ds.cube.kpis(sel)
+            ds.cube.top(sel)
+            allocation(ds.cube, sel)
+            for bucket in ("Day", "Month"):
+                trend(ds.cube, sel, bucket)
+
+    def queries_cold():
+        fresh = _fresh(df, mapping)
+        for q in QUESTIONS:
+            query.answer(fresh, q)
+
+    def queries_warm():
+        for q in QUESTIONS:
+            query.answer(ds, q)
+
+    def preview():
+        fresh = _fresh(df, mapping)
+        positions = filter_positions(fresh, {fresh.cat: top_cats[0], fresh.status: "Paid"})
+        for n in range(5):
+            page(fresh, positions, n, 100)
+
+    def export_csv():
+        export_file(ds, filter_positions(ds, {ds.status: "Paid"}), "CSV").close()
+
+    for q in QUESTIONS:
+        query.answer(ds, q)
+    return [
+        ("ingest", lambda: read_table("ledger.csv", data)),
+        ("schema", schema_stage),
+        ("cube", lambda: _fresh(df, mapping).cube),
+        ("dashboard", dashboard),
+        ("query_cold", queries_cold),
+        ("query_warm", queries_warm),
+        ("preview", preview),
+        ("export_csv", export_csv),
+    ]
+
+
+def pdf_stages(data):
+    digest = file_digest(data)
+
+    def extract():
+        PAGE_CACHE.clear()
+        PdfDocument(data, digest).wait()
+
+    doc = PdfDocument(data, digest)
+    doc.wait()
+    return [
+        ("pdf_extract", extract),
+        ("pdf_search", lambda: [pdf_answer([doc], q) for q in PDF_QUESTIONS]),
+    ]
+
+
+def run(rows, pages, workdir, memory=True):
+    """{'stage[size]': {'seconds': .., 'peak_mb': ..}} for every requested size"""
+    os.makedirs(workdir, exist_ok=True)
+    results = {}
+    for n in rows:
+        path = os.path.join(workdir, f"ledger_{n}.csv")
+        if not os.path.exists(path):
+            write_ledger_csv(path, n)
+        with open(path, "rb") as f:
+            data = f.read()
+        for name, stage in ledger_stages(data):
+            seconds, peak = measure(stage, memory)
+            results[f"{name}[{n}]"] = {"seconds": seconds, "peak_mb": peak, "rows": n}
+            _print_row(f"{name}[{n}]", results[f"{name}[{n}]"])
+    if pages:
+        path = os.path.join(workdir, f"report_{pages}p.pdf")
+        if not os.path.exists(path):
+            write_pdf(path, pages)
+        with open(path, "rb") as f:
+            data = f.read()
+        for name, stage in pdf_stages(data):
+            seconds, peak = measure(stage, memory)
+            results[f"{name}[{pages}p]"] = {"seconds": seconds, "peak_mb": peak, "pages": pages}
+            _print_row(f"{name}[{pages}p]", results[f"{name}[{pages}p]"])
+    return results
+
+
+def _print_row(key, r):
+    peak = f"{r['peak_mb']:>9.1f} MB" if r["peak_mb"] is not None else f"{'-':>12}"
+    print(f"{key:<28} {r['seconds'] * 1000:>10.1f} ms {peak}", flush=True)
+
+
+def regressions(results, baseline, tolerance=TOLERANCE):
+    """Messages for every stage that is slower or larger than its baseline allows"""
+    out = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if r["seconds"] > base["seconds"] * tolerance + SLACK_SECONDS:
+            out.append(f"{key}: {r['seconds'] * 1000:.1f} ms vs baseline {base['seconds'] * 1000:.1f} ms")
+        if r["peak_mb"] is not None and r["peak_mb"] > base["peak_mb"] * tolerance + SLACK_MB:
+            out.append(f"{key}: peak {r['peak_mb']:.1f} MB vs baseline {base['peak_mb']:.1f} MB")
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--rows", default="10k,100k", help="comma-separated ledger sizes, e.g. 10k,1m,10m")
+    ap.add_argument("--pages", type=int, default=100, help="pages in the synthetic PDF (0 to skip)")
+    ap.add_argument("--no-memory", action="store_true", help="time only; skip the tracemalloc pass")
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown/growth factor")
+    ap.add_argument("--json", help="also write the results to this file")
+    ap.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "mb-bench"),
+                    help="where generated inputs are kept between runs")
+    args = ap.parse_args(argv)
+
+    rows = [parse_size(s) for s in args.rows.split(",") if s.strip()]
+    print(f"{'stage':<28} {'time':>13} {'peak':>12}")
+    results = run(rows, args.pages, args.workdir, memory=not args.no_memory)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        if args.no_memory:
+            ap.error("--update-baseline needs the memory pass")
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline stored yet; run with --update-baseline to record one.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    failed = regressions(results, baseline, args.tolerance)
+    for msg in failed:
+        print(f"REGRESSION {msg}")
+    print("FAIL" if failed else "OK", f"({len(results)} stages, tolerance ×{args.tolerance})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Measure how long a new session takes to start, cold and warm.
+
+    python -m benchmarks.startup                  # 5 fresh processes
+    python -m benchmarks.startup --repeat 10 --json startup.json
+
+Each repeat runs in a new Python process, like a freshly started server:
+``import streamlit`` is timed, then the login page of ``app.py`` is run
+headlessly with Streamlit's AppTest (the first session: a cold start), then a
+few more sessions (warm starts), and finally the first Dashboard run after
+logging in. Start times come from the app's own ``start:cold`` /
+``start:warm`` stage timings. The heavy modules (pandas, Plotly, pdfplumber,
+DuckDB) that were already imported when the login page was drawn are listed,
+since none of them should be.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+ROOT = os.path.dirname(APP)
+REPEAT = 5
+WARM_SESSIONS = 5
+HEAVY = ("pandas", "plotly.express", "pdfplumber", "duckdb")
+
+
+def child():
+    """One fresh process: {'import_ms', 'cold_ms', 'warm_ms', 'dashboard_ms', 'heavy_on_login'}"""
+    t0 = time.perf_counter()
+    import streamlit  # noqa: F401
+    from streamlit.testing.v1 import AppTest
+    import_ms = (time.perf_counter() - t0) * 1000
+
+    def session():
+        at = AppTest.from_file(APP, default_timeout=120)
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        return at
+
+    session()
+    heavy = [m for m in HEAVY if m in sys.modules]
+    for _ in range(WARM_SESSIONS):
+        at = session()
+    at.session_state.auth = True
+    at.run()
+    from engine.timing import TIMINGS
+    entries = [json.loads(line) for line in TIMINGS.jsonl().splitlines()]
+    return {"import_ms": import_ms,
+            "cold_ms": next(e["ms"]["start:cold"] for e in entries if "start:cold" in e["ms"]),
+            "warm_ms": float(np.median([e["ms"]["start:warm"] for e in entries if "start:warm" in e["ms"]])),
+            "dashboard_ms": entries[-1]["ms"]["rerun"], "heavy_on_login": heavy}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--repeat", type=int, default=REPEAT, help="fresh processes to run (median kept)")
+    ap.add_argument("--json", help="also write the results to this file")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(child()))
+        return 0
+    # Cosmetic delays would swamp the numbers
+    env = dict(os.environ, MB_FAST_MODE="1")
+    runs = []
+    for _ in range(args.repeat):
+        out = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--child"], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    results = {k: float(np.median([r[k] for r in runs])) for k in ("import_ms", "cold_ms", "warm_ms", "dashboard_ms")}
+    results["heavy_on_login"] = sorted({m for r in runs for m in r["heavy_on_login"]})
+    print(f"{'import streamlit':<22} {results['import_ms']:>9.1f} ms")
+    print(f"{'cold start (login)':<22} {results['cold_ms']:>9.1f} ms")
+    print(f"{'warm start (login)':<22} {results['warm_ms']:>9.1f} ms")
+    print(f"{'first Dashboard run':<22} {results['dashboard_ms']:>9.1f} ms")
+    print(f"heavy modules on the login page: {', '.join(results['heavy_on_login']) or 'none'}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"repeat": args.repeat, "results": results, "runs": runs}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
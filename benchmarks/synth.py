@@ -0,0 +1,127 @@
+"""Synthetic Magic Bus ledgers and PDF reports for benchmarking.
+
+Everything is generated from a seeded numpy RNG, so a given size always
+produces the same bytes. Ledgers are written in chunks (10M rows never sit
+in memory as one frame) and PDFs are written by hand with the built-in
+Helvetica font, so neither needs anything beyond numpy and pandas.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+PROGRAMS = ["Sports for Development", "Childhood to Livelihood", "Employability Skills", "Adolescent Life Skills",
+            "Digital Literacy", "Girls Football League", "Teacher Training", "Community Youth Leaders",
+            "Financial Literacy", "Health and Hygiene", "Career Counselling", "Entrepreneurship Lab"]
+REGIONS = ["Mumbai", "Delhi", "Hyderabad", "Chennai", "Kolkata", "Pune", "Bengaluru", "Ranchi",
+           "Bhopal", "Lucknow", "Jaipur", "Patna", "Guwahati", "Nagpur", "Indore", "Vizag"]
+DONORS = ["Tata Trust", "HDFC Bank CSR", "Infosys Foundation", "Azim Premji Foundation", "Reliance Foundation",
+          "Wipro Cares", "Mahindra Rise", "ICICI Foundation", "Standard Chartered", "Accenture", "Deloitte",
+          "Individual Donors"]
+STATUSES = ["Paid", "Pending", "Approved", "Rejected", "On Hold"]
+STATUS_WEIGHTS = [0.55, 0.2, 0.15, 0.05, 0.05]
+START = np.datetime64("2021-04-01")
+DAYS = 5 * 365
+CHUNK_ROWS = 500_000
+
+
+def parse_size(text):
+    """'10k' -> 10_000, '2.5m' -> 2_500_000, '300' -> 300"""
+    text = str(text).strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def ledger(n_rows, seed=0, offset=0):
+    """One frame of ``n_rows`` ledger rows: project, donor, region, amount, date, status"""
+    projects = np.array([f"{p} - {r}" for p in PROGRAMS for r in REGIONS])
+    # Skewed project/donor popularity, like a real ledger (fixed per seed across chunks)
+    popularity = np.random.default_rng(seed)
+    p_proj = popularity.dirichlet(np.full(len(projects), 0.6))
+    p_donor = popularity.dirichlet(np.full(len(DONORS), 1.5))
+    rng = np.random.default_rng([seed, offset])
+    amounts = np.round(rng.lognormal(mean=9.5, sigma=1.2, size=n_rows), 2)
+    days = rng.integers(0, DAYS, size=n_rows)
+    return pd.DataFrame({
+        "Voucher No": np.arange(offset, offset + n_rows) + 100_000,
+        "Project Name": projects[rng.choice(len(projects), size=n_rows, p=p_proj)],
+        "Donor": np.array(DONORS)[rng.choice(len(DONORS), size=n_rows, p=p_donor)],
+        "Region": np.array(REGIONS)[rng.integers(0, len(REGIONS), size=n_rows)],
+        "Amount Spent": amounts,
+        "Date": pd.to_datetime(START + days).strftime("%Y-%m-%d"),
+        "Status": np.array(STATUSES)[rng.choice(len(STATUSES), size=n_rows, p=STATUS_WEIGHTS)],
+    })
+
+
+def write_ledger_csv(path, n_rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """Write an ``n_rows`` ledger CSV chunk by chunk; returns ``path``"""
+    tmp = f"{path}.part"
+    with open(tmp, "w", newline="") as f:
+        for start in range(0, n_rows, chunk_rows):
+            chunk = ledger(min(chunk_rows, n_rows - start), seed=seed, offset=start)
+            chunk.to_csv(f, index=False, header=start == 0)
+    os.replace(tmp, path)
+    return path
+
+
+SENTENCES = [
+    "{program} in {region} reached {n} children this quarter.",
+    "{donor} disbursed Rs {amount} towards {program}.",
+    "Attendance at {region} community centres rose to {pct} percent.",
+    "Field staff in {region} completed {n} mentoring sessions for adolescents.",
+    "Utilisation of the {donor} grant stands at {pct} percent of the annual budget.",
+    "The {program} curriculum was revised after feedback from {n} youth leaders.",
+    "Audit observations for {region} were closed within {days} days.",
+]
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def report_pages(n_pages, lines_per_page=45, seed=0):
+    """Lines of text for each page of a synthetic programme report"""
+    rng = np.random.default_rng(seed)
+    pages = []
+    for p in range(n_pages):
+        lines = [f"Magic Bus Programme Report - Page {p + 1}"]
+        for _ in range(lines_per_page - 1):
+            lines.append(SENTENCES[rng.integers(len(SENTENCES))].format(
+                program=PROGRAMS[rng.integers(len(PROGRAMS))], region=REGIONS[rng.integers(len(REGIONS))],
+                donor=DONORS[rng.integers(len(DONORS))], n=int(rng.integers(20, 5000)),
+                amount=f"{int(rng.integers(10_000, 5_000_000)):,}", pct=int(rng.integers(40, 100)),
+                days=int(rng.integers(5, 90))))
+        pages.append(lines)
+    return pages
+
+
+def write_pdf(path, n_pages, lines_per_page=45, seed=0):
+    """Write a text PDF of ``n_pages`` A4 pages by hand (catalog, page tree, Helvetica, one stream per page)"""
+    pages = report_pages(n_pages, lines_per_page, seed)
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>",
+               3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"}
+    kids = []
+    for i, lines in enumerate(pages):
+        page_id, content_id = 4 + 2 * i, 5 + 2 * i
+        kids.append(f"{page_id} 0 R")
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 800 Td"] + [f"({_escape(line)}) '" for line in lines] + ["ET"]
+        stream = "\n".join(ops).encode("latin-1")
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>").encode()
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for oid in sorted(objects):
+        offsets[oid] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (oid, objects[oid])
+    xref = len(out)
+    size = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for oid in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[oid]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
@@ -0,0 +1 @@
+"""Data engine behind the Magic Bus Intelligence Hub (parsing, caching, aggregation)."""
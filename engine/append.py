@@ -0,0 +1,188 @@
+"""Incremental append: add a new CSV/Excel batch to a loaded ledger.
+
+The batch is checked against the dataset's schema (same columns, and the
+auto-mapper must not pick different Amount / Category / Date / Status
+columns), deduplicated against every row already loaded by hashing a key
+(the id-like columns by default, else the whole row), and published as a new
+``Dataset`` whose parts are the old parts plus the new rows. Nothing already
+loaded is copied or rescanned: the key hashes are kept sorted so lookups are
+binary searches, and the aggregate cube is merged with a cube of the batch.
+Structures derived from the full rows (preview filters, AI Analyst lookups)
+are rebuilt lazily when a view needs them.
+"""
+import hashlib
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine.charts import parse_dates
+from engine.cube import AggregateCube
+from engine.dataset import Dataset
+from engine.ingest import SAMPLE_ROWS, read_table
+from engine.schema import auto_map_columns, infer_schema
+from engine.workspace import SOURCE_COL
+
+ROLES = ("Amount", "Category", "Date", "Status")
+# Hash of a missing value in any column
+NA_HASH = np.uint64(0)
+
+
+class SchemaMismatch(ValueError):
+    """The batch does not have the loaded dataset's columns or mapping"""
+
+
+class AppendReport:
+    """Rows read, added and skipped as duplicates for one appended batch"""
+
+    def __init__(self, name, digest, rows=0, added=0, seconds=0.0):
+        self.name = name
+        self.digest = digest
+        self.rows = rows
+        self.added = added
+        self.seconds = seconds
+
+    @property
+    def duplicates(self):
+        return self.rows - self.added
+
+    def __str__(self):
+        return (f"{self.name}: {self.added:,} of {self.rows:,} rows added "
+                f"({self.duplicates:,} duplicates skipped) in {self.seconds:.2f}s")
+
+
+def append_digest(base, batch):
+    """Content key of a dataset with one more batch appended"""
+    return hashlib.sha256(f"append:{base}:{batch}".encode()).hexdigest()
+
+
+def default_key(dataset):
+    """Id-like columns (voucher / transaction numbers) to dedupe on; [] means the whole row"""
+    sample = dataset.parts[0].head(SAMPLE_ROWS)
+    return [c for c, p in infer_schema(sample).profiles.items() if p.id_like]
+
+
+def _column_hashes(s):
+    """uint64 hash per value; numbers hash as float64 so 5 and 5.0 (or int and category) agree"""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        lookup = np.append(_column_hashes(pd.Series(s.cat.categories)), NA_HASH)
+        return lookup[s.cat.codes.to_numpy()]
+    if pd.api.types.is_bool_dtype(s) or pd.api.types.is_numeric_dtype(s):
+        values = s.to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        values = s.astype(str).to_numpy(dtype=object)
+    return np.where(s.isna().to_numpy(), NA_HASH, pd.util.hash_array(values))
+
+
+def row_hashes(df, key):
+    """One uint64 hash per row over the ``key`` columns (all columns when empty)"""
+    out = np.zeros(len(df), dtype="uint64")
+    for c in (key or [c for c in df.columns if c != SOURCE_COL]):
+        # Order-sensitive combine; uint64 arithmetic wraps
+        out = out * np.uint64(1_000_003) ^ _column_hashes(df[c])
+    return out
+
+
+class KeyIndex:
+    """Sorted hashes of every key already loaded"""
+
+    def __init__(self, hashes):
+        self.hashes = np.unique(hashes)
+
+    def fresh(self, hashes):
+        """Mask of batch rows whose key is neither loaded nor repeated earlier in the batch"""
+        keep = np.zeros(len(hashes), dtype=bool)
+        keep[np.unique(hashes, return_index=True)[1]] = True
+        if len(self.hashes):
+            pos = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+            keep &= self.hashes[pos] != hashes
+        return keep
+
+    @property
+    def nbytes(self):
+        return self.hashes.nbytes
+
+    def merged(self, hashes):
+        hashes = np.unique(hashes)
+        out = KeyIndex.__new__(KeyIndex)
+        out.hashes = np.insert(self.hashes, np.searchsorted(self.hashes, hashes), hashes)
+        return out
+
+
+def key_index(dataset, key):
+    """The dataset's KeyIndex for ``key``, built once (later appends carry it forward)"""
+    return dataset.derived(("key_index", tuple(key)), lambda ds: KeyIndex(np.concatenate(
+        [row_hashes(p, key) for p in ds.parts]) if ds.parts else np.array([], dtype="uint64")))
+
+
+def check_schema(dataset, sample):
+    """Raise ``SchemaMismatch`` unless ``sample`` fits the dataset; returns the dataset's mapping"""
+    expected = [c for c in dataset.columns if c != SOURCE_COL]
+    missing = [c for c in expected if c not in sample.columns]
+    extra = [c for c in sample.columns if c not in expected]
+    if missing or extra:
+        raise SchemaMismatch("; ".join(filter(None, [
+            f"missing column(s): {', '.join(map(str, missing))}" if missing else "",
+            f"unexpected column(s): {', '.join(map(str, extra))}" if extra else ""])))
+    found = auto_map_columns(sample)
+    wrong = [f"{role} looks like '{theirs}', not '{mine}'"
+             for role, mine, theirs in zip(ROLES, dataset.mapping, found) if theirs and mine and theirs != mine]
+    if wrong:
+        raise SchemaMismatch("; ".join(wrong))
+    return dataset.mapping
+
+
+def _conform(batch, like, name):
+    """Give the batch the loaded dataset's column order and category columns"""
+    if SOURCE_COL in like.columns:
+        batch[SOURCE_COL] = name
+    batch = batch[list(like.columns)]
+    cats = {c: "category" for c in like.columns
+            if isinstance(like[c].dtype, pd.CategoricalDtype) and not isinstance(batch[c].dtype, pd.CategoricalDtype)}
+    batch = batch.astype(cats) if cats else batch
+    for c in like.columns:
+        if isinstance(like[c].dtype, pd.CategoricalDtype):
+            kind = like[c].cat.categories.dtype
+            if len(batch[c].cat.categories) and batch[c].cat.categories.dtype != kind:
+                try:
+                    batch[c] = batch[c].cat.rename_categories(batch[c].cat.categories.astype(kind))
+                except (TypeError, ValueError):
+                    raise SchemaMismatch(f"column '{c}' holds {batch[c].cat.categories.dtype} values, "
+                                         f"not {kind}") from None
+    return batch
+
+
+def append_batch(dataset, name, data, digest, key=None, progress=None):
+    """Append one CSV/Excel batch to an in-memory dataset.
+
+    ``key`` lists the columns that identify a row (``default_key`` when None;
+    [] for the whole row). Returns ``(new_dataset, AppendReport)``; the
+    given dataset is left unchanged.
+    """
+    if dataset.columnar:
+        raise ValueError("Appending is only supported by the in-memory engine")
+    t0 = time.perf_counter()
+    key = default_key(dataset) if key is None else list(key)
+    batch, mapping, _ = read_table(name, data, mapper=lambda sample: check_schema(dataset, sample),
+                                   progress=progress)
+    batch = _conform(batch, dataset.parts[0], name)
+
+    index = key_index(dataset, key)
+    hashes = row_hashes(batch, key)
+    keep = index.fresh(hashes)
+    delta = batch[keep].reset_index(drop=True) if not keep.all() else batch
+
+    out = Dataset(None, mapping, digest=append_digest(dataset.digest, digest), name=dataset.name,
+                  report=dataset.report, parts=dataset.parts + ([delta] if len(delta) else []))
+    out.sources, out.skipped = dataset.sources, dataset.skipped
+    out._nbytes = dataset.nbytes - dataset._extra_nbytes + int(delta.memory_usage(index=True, deep=True).sum())
+    out._derived[("key_index", tuple(key))] = index.merged(hashes[keep])
+    out._cube = dataset.cube
+    if dataset.cube is not None and len(delta):
+        amt, cat, date, _ = mapping
+        dates = parse_dates(delta[date]) if date else None
+        out._cube = dataset.cube.merged(AggregateCube(delta, amt, cat, date, dates=dates))
+    out._grow(out._derived[("key_index", tuple(key))].nbytes + (out._cube.nbytes if out._cube is not None else 0))
+    report = AppendReport(name, digest, rows=len(batch), added=len(delta), seconds=time.perf_counter() - t0)
+    out.batches = dataset.batches + [report]
+    return out, report
@@ -0,0 +1,162 @@
+"""Content-addressed parse cache shared by every session of the app.
+
+Entries are keyed by the SHA-256 of the uploaded bytes, so the same ledger
+opened by two people (or re-uploaded under another name) is parsed once.
+The store is an LRU bounded by a memory budget. Items are sized with
+``sizeof`` (default: their ``nbytes`` attribute) when they are stored;
+``Resizable`` items report what they build afterwards (indexes, extracted
+pages), so lazily built structures count against the budget too.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def file_digest(data):
+    """SHA-256 hex digest of the raw upload bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class Resizable:
+    """Mixin for cached items that grow after they are stored; ``_grew`` charges every cache holding them"""
+
+    def hold(self, cache, key):
+        if self.__dict__.get("_released"):
+            cache.discard(key, self)
+            return
+        holders = self.__dict__.setdefault("_holders", [])
+        if not any(c is cache and k == key for c, k in holders):
+            holders.append((cache, key))
+
+    def _grew(self, nbytes):
+        for cache, key in list(self.__dict__.get("_holders", ())):
+            cache.charge(key, self, nbytes)
+
+    def release(self):
+        """Drop this item from every cache holding it, now and if stored later (it turned out incomplete)"""
+        self._released = True
+        for cache, key in self.__dict__.pop("_holders", ()):
+            cache.discard(key, self)
+
+
+class ParseCache:
+    """Thread-safe LRU of parsed uploads with a memory budget and hit/miss counters"""
+
+    def __init__(self, budget_mb=512, sizeof=None):
+        self.sizeof = sizeof or (lambda item: int(getattr(item, "nbytes", 0)))
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, digest):
+        with self._lock:
+            item = self._items.get(digest)
+            if item is not None:
+                self._items.move_to_end(digest)
+                self.hits += 1
+            return item
+
+    def put(self, digest, item):
+        size = self.sizeof(item)
+        with self._lock:
+            if digest in self._items:
+                self._items.pop(digest)
+                self.used -= self._sizes.pop(digest)
+            # An item larger than the whole budget is served but never stored
+            if size > self.budget:
+                return item
+            self._items[digest] = item
+            self._sizes[digest] = size
+            self.used += size
+            self._evict()
+        if isinstance(item, Resizable):
+            item.hold(self, digest)
+        return item
+
+    def charge(self, digest, item, nbytes):
+        """Count ``nbytes`` more for ``item`` (built after it was stored), evicting to stay in budget"""
+        with self._lock:
+            if self._items.get(digest) is not item:
+                return
+            self._sizes[digest] += nbytes
+            self.used += nbytes
+            self._evict()
+
+    def get_or_parse(self, digest, parse):
+        """Return the cached item for ``digest`` or build it with ``parse()``.
+
+        Concurrent callers asking for the same digest wait on a per-key lock,
+        so a file opened in two sessions at once is still parsed only once.
+        """
+        item = self.get(digest)
+        if item is not None:
+            return item
+        with self._lock:
+            key_lock = self._key_locks.setdefault(digest, threading.Lock())
+        with key_lock:
+            item = self.get(digest)
+            if item is not None:
+                return item
+            with self._lock:
+                self.misses += 1
+            item = self.put(digest, parse())
+        with self._lock:
+            self._key_locks.pop(digest, None)
+        return item
+
+    def discard(self, digest, item=None):
+        """Remove ``digest`` (only if it still holds ``item``, when given)"""
+        with self._lock:
+            if digest in self._items and (item is None or self._items[digest] is item):
+                self._items.pop(digest)
+                self.used -= self._sizes.pop(digest)
+
+    def count_miss(self):
+        """Record a miss for an item that is being built outside ``get_or_parse``"""
+        with self._lock:
+            self.misses += 1
+
+    def set_budget(self, budget_mb):
+        with self._lock:
+            self.budget = int(budget_mb * 1024 * 1024)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self.used = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "used_mb": self.used / 1024 / 1024,
+                "budget_mb": self.budget / 1024 / 1024,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __contains__(self, digest):
+        with self._lock:
+            return digest in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def _evict(self):
+        # Caller holds self._lock
+        while self.used > self.budget and self._items:
+            key, _ = self._items.popitem(last=False)
+            self.used -= self._sizes.pop(key)
+            self.evictions += 1
@@ -0,0 +1,131 @@
+"""Chart data layer: date parsing, time bucketing and downsampling.
+
+Plotly figures only ever receive small, pre-aggregated frames: the top-N
+bar, a pie bounded to a fixed number of slices, and a trend resampled into
+day/week/month/quarter buckets and LTTB-downsampled above a point budget.
+The payload sent to the browser is therefore bounded regardless of how many
+rows the ledger has.
+"""
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+BUCKETS = {"Day": "D", "Week": "W", "Month": "MS", "Quarter": "QS"}
+MAX_POINTS = 1000
+MAX_SLICES = 12
+DATE_FORMATS = [
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y",
+    "%m/%d/%Y", "%d-%m-%y", "%d/%m/%y", "%d-%b-%Y", "%d %b %Y", "%d-%b-%y", "%b %d, %Y",
+    "%d %B %Y", "%B %d, %Y", "%b-%Y", "%b %Y", "%B %Y", "%Y-%m", "%Y%m%d", "%Y",
+]
+SAMPLE = 200
+
+_formats = {}
+_formats_lock = threading.Lock()
+
+
+def _shape(value):
+    """Signature of a date string: digits -> 9, letters -> a ('12-Mar-2024' -> '99-aaa-9999')"""
+    return re.sub(r"[A-Za-z]", "a", re.sub(r"\d", "9", value.strip()))
+
+
+def infer_date_format(values):
+    """strftime format that parses (nearly) all sample strings, cached by their shape"""
+    sample = [str(v) for v in values[:SAMPLE]]
+    if not sample:
+        return None
+    key = tuple(sorted({_shape(v) for v in sample}))
+    with _formats_lock:
+        if key in _formats:
+            return _formats[key]
+    found = None
+    for fmt in DATE_FORMATS:
+        parsed = pd.to_datetime(pd.Series(sample), format=fmt, errors="coerce")
+        if parsed.notna().mean() >= 0.95:
+            found = fmt
+            break
+    with _formats_lock:
+        _formats[key] = found
+    return found
+
+
+def _parse_strings(values):
+    s = pd.Series(values)
+    fmt = infer_date_format(s.dropna().astype(str).to_numpy())
+    if fmt is not None:
+        return pd.to_datetime(s.astype(str), format=fmt, errors="coerce")
+    return pd.to_datetime(s, errors="coerce", format="mixed")
+
+
+def parse_dates(s):
+    """Parse a date column once into tz-naive datetime64 (unparseable -> NaT).
+
+    Category columns parse only their distinct values; string columns use a
+    format inferred from a sample and cached, avoiding per-row guessing.
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        out = s
+    elif isinstance(s.dtype, pd.CategoricalDtype):
+        cats = parse_dates(pd.Series(s.cat.categories))
+        # Missing values have code -1, which picks the NaT appended at the end
+        lookup = np.append(cats.to_numpy(dtype="datetime64[ns]"), np.datetime64("NaT", "ns"))
+        out = pd.Series(lookup[s.cat.codes.to_numpy()], index=s.index, name=s.name)
+    elif pd.api.types.is_numeric_dtype(s):
+        # Bare years (2023) are common; anything else numeric is not a date we can trust
+        years = s.where((s >= 1900) & (s <= 2100) & (s == np.floor(s)))
+        out = pd.to_datetime(years.astype("Int64").astype(str), format="%Y", errors="coerce")
+        out.index = s.index
+    else:
+        out = _parse_strings(s.to_numpy())
+        out.index, out.name = s.index, s.name
+    if getattr(out.dt, "tz", None) is not None:
+        out = out.dt.tz_localize(None)
+    return out
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets downsampling; returns the kept indices"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle vertex
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def trend(cube, sel_cats=None, bucket="Month", max_points=MAX_POINTS):
+    """Trend frame for the selection, resampled into a bucket and capped at max_points"""
+    daily = cube.trend(sel_cats)
+    if daily is None or daily.empty:
+        return daily
+    s = daily.set_index(cube.date)[cube.amt]
+    s = s.resample(BUCKETS[bucket]).sum() if bucket != "Day" else s
+    if len(s) > max_points:
+        keep = lttb(s.index.asi8, s.to_numpy(), max_points)
+        s = s.iloc[keep]
+    return pd.DataFrame({cube.date: s.index, cube.amt: s.to_numpy()})
+
+
+def allocation(cube, sel_cats=None, max_slices=MAX_SLICES):
+    """Per-category totals for the pie, with everything past the largest slices folded into 'Other'"""
+    df = cube.by_category(sel_cats)
+    if len(df) <= max_slices:
+        return df
+    df = df.sort_values(by=cube.amt, ascending=False)
+    head, rest = df.iloc[:max_slices - 1], df.iloc[max_slices - 1:]
+    other = pd.DataFrame({cube.cat: [f"Other ({len(rest):,})"], cube.amt: [rest[cube.amt].sum()]})
+    return pd.concat([head.astype({cube.cat: object}), other], ignore_index=True)
@@ -0,0 +1,410 @@
+"""Optional out-of-core backend: Parquet on disk, queried with DuckDB.
+
+An upload is converted once into a Parquet file (row groups of
+``ROW_GROUP_ROWS``) in ``STORE_DIR``, keyed by its content hash, so the same
+file is never converted twice, even across restarts. The CSV is streamed by
+DuckDB straight to Parquet; currency text is converted in the same pass.
+``ColumnarDataset`` then answers the Dashboard, Data Preview and AI Analyst
+with SQL over that file: each query names only the columns it needs and its
+filters are pushed down to the Parquet scan, so only those columns and the
+matching row groups are read and memory stays flat as the file grows.
+
+Needs ``pyarrow`` and ``duckdb``; ``available()`` says whether both are
+installed.
+"""
+import io
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from engine.charts import infer_date_format
+from engine.dataset import Dataset
+from engine.ingest import SAMPLE_ROWS, IngestReport
+from engine.jobs import Cancelled, Progress
+from engine.schema import infer_schema, parse_currency
+
+try:
+    import duckdb
+    import pyarrow  # noqa: F401  (DuckDB's pandas/Parquet interop needs it)
+except ImportError:
+    duckdb = None
+
+STORE_DIR = os.environ.get("MB_COLUMNAR_DIR", os.path.join(tempfile.gettempdir(), "magicbus-columnar"))
+MEMORY_LIMIT = os.environ.get("MB_COLUMNAR_MEMORY", "512MB")
+ROW_GROUP_ROWS = 122_880
+MAX_DISTINCT = 10_000
+# Other text columns with at most this many values are offered as AI Analyst filters
+VOCAB_DISTINCT = 1_000
+MEMO_SIZE = 256
+PERIOD_UNITS = {"D": "day", "W": "week", "M": "month", "Q": "quarter", "Y": "year"}
+
+
+def available():
+    return duckdb is not None
+
+
+def _q(name):
+    """Quote an identifier for SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _currency_sql(col):
+    """SQL twin of schema.parse_currency for one column"""
+    v = f"trim(CAST({_q(col)} AS VARCHAR))"
+    neg = (f"(({v} LIKE '(%)') OR ({v} LIKE '%-' AND {v} NOT LIKE '%/-') "
+           f"OR regexp_matches(lower({v}), '\\bdr\\.?$'))")
+    clean = f"regexp_replace(lower({v}), '\\s*(dr|cr)\\.?$', '')"
+    clean = f"rtrim(regexp_replace({clean}, '₹|rs\\.?|inr|\\$|€|£|,|/-|\\s|\\(|\\)', '', 'g'), '-')"
+    num = f"TRY_CAST({clean} AS DOUBLE)"
+    return f"CASE WHEN {neg} THEN -abs({num}) ELSE {num} END"
+
+
+def _connect():
+    con = duckdb.connect(":memory:")
+    con.execute(f"SET memory_limit = '{MEMORY_LIMIT}'")
+    return con
+
+
+def _run_interruptible(con, sql, progress, total):
+    """Run one long statement, feeding DuckDB's progress into ``progress`` and interrupting on cancel"""
+    done = threading.Event()
+
+    def watch():
+        while not done.wait(0.2):
+            if progress.cancelled:
+                con.interrupt()
+                return
+            pct = con.query_progress()
+            if pct and pct > 0:
+                progress.update(bytes_done=int(total * min(pct, 100) / 100))
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        con.execute(sql)
+    except duckdb.InterruptException:
+        raise Cancelled()
+    finally:
+        done.set()
+        watcher.join()
+
+
+def convert(name, data, digest, progress=None, sheet_name=0):
+    """Write the upload to ``STORE_DIR/<digest>.parquet`` once; returns ``(path, mapping, report)``"""
+    t0 = time.perf_counter()
+    progress = progress or Progress()
+    progress.update(phase="Sampling", bytes_total=len(data))
+    os.makedirs(STORE_DIR, exist_ok=True)
+    path = os.path.join(STORE_DIR, f"{digest}.parquet")
+    is_csv = name.lower().endswith(".csv")
+
+    if is_csv:
+        sample = pd.read_csv(io.BytesIO(data), nrows=SAMPLE_ROWS)
+    else:
+        progress.update(phase="Reading workbook")
+        sample = pd.read_excel(io.BytesIO(data), sheet_name=sheet_name)
+    progress.check()
+    schema = infer_schema(sample)
+    money = set(schema.currency_columns)
+
+    if not os.path.exists(path):
+        progress.update(phase="Converting to Parquet")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        con = _connect()
+        try:
+            if is_csv:
+                src = f"{tmp}.csv"
+                with open(src, "wb") as f:
+                    f.write(data)
+                replace = ", ".join(f"{_currency_sql(c)} AS {_q(c)}" for c in money)
+                select = (f"SELECT * {f'REPLACE ({replace})' if replace else ''} "
+                          f"FROM read_csv('{src}', header = true, sample_size = {SAMPLE_ROWS * 4})")
+                try:
+                    _run_interruptible(con, f"COPY ({select}) TO '{tmp}' (FORMAT PARQUET, ROW_GROUP_SIZE {ROW_GROUP_ROWS})",
+                                       progress, len(data))
+                finally:
+                    os.remove(src)
+            else:
+                frame = sample.assign(**{c: parse_currency(sample[c]) for c in money})
+                con.register("frame", frame)
+                con.execute(f"COPY frame TO '{tmp}' (FORMAT PARQUET, ROW_GROUP_SIZE {ROW_GROUP_ROWS})")
+            os.replace(tmp, path)
+        finally:
+            con.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    del sample
+
+    rows = _scalar(f"SELECT count(*) FROM read_parquet('{path}')")
+    progress.update(bytes_done=len(data), rows=rows)
+    report = IngestReport(rows=rows, seconds=time.perf_counter() - t0, peak_bytes=len(data),
+                          final_bytes=os.path.getsize(path), chunks=max(1, -(-rows // ROW_GROUP_ROWS)))
+    return path, schema.mapping, report
+
+
+def _scalar(sql):
+    con = _connect()
+    try:
+        return con.execute(sql).fetchone()[0]
+    finally:
+        con.close()
+
+
+def load_columnar(name, data, digest, progress=None):
+    """Convert (once) and open an upload as a ColumnarDataset"""
+    path, mapping, report = convert(name, data, digest, progress)
+    return ColumnarDataset(path, mapping, digest=digest, name=name, report=report)
+
+
+class ColumnarDataset(Dataset):
+    """A ledger kept on disk as Parquet; every view is answered with a pushed-down DuckDB scan"""
+
+    columnar = True
+
+    def __init__(self, path, mapping, digest=None, name=None, report=None):
+        super().__init__(None, mapping, digest=digest, name=name, report=report)
+        self.path = path
+        self._con = _connect()
+        self._con.execute(f"CREATE VIEW t AS SELECT * FROM read_parquet('{path}')")
+        described = self._con.execute("DESCRIBE t").fetchall()
+        self.types = OrderedDict((r[0], r[1]) for r in described)
+        self.n_rows = self._con.execute("SELECT count(*) FROM t").fetchone()[0]
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    @property
+    def columns(self):
+        return list(self.types)
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def nbytes(self):
+        # Only metadata and small memoised results live in memory
+        return 64 * 1024
+
+    @property
+    def dates(self):
+        return None
+
+    @property
+    def cube(self):
+        if self._cube is None and self.amt and self.cat:
+            self._cube = ColumnarCube(self)
+        return self._cube
+
+    # --- SQL helpers -----------------------------------------------------
+    def sql(self, query, params=None):
+        """Run a query on a private cursor (safe across sessions) and return a DataFrame"""
+        cur = self._con.cursor()
+        try:
+            return cur.execute(query, params or []).df()
+        finally:
+            cur.close()
+
+    def cached(self, key, build):
+        with self._memo_lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        value = build()
+        with self._memo_lock:
+            self._memo[key] = value
+            if len(self._memo) > MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return value
+
+    @property
+    def amount_sql(self):
+        return f"TRY_CAST({_q(self.amt)} AS DOUBLE)"
+
+    @property
+    def date_sql(self):
+        """Expression giving the date column as TIMESTAMP (NULL when unparseable)"""
+        return self.derived("date_sql", _date_sql)
+
+    def where(self, filters=(), date_from=None, date_to=None, extra=()):
+        """(WHERE clause, params) for ``{col: value or [values]}`` filters and a date range"""
+        clauses, params = list(extra), []
+        for col, values in (filters.items() if isinstance(filters, dict) else filters):
+            values = list(values) if isinstance(values, (list, tuple, set)) else [values]
+            clauses.append(f"{_q(col)} IN ({', '.join('?' * len(values))})")
+            params += values
+        if date_from is not None:
+            clauses.append(f"{self.date_sql} >= ?")
+            params.append(pd.Timestamp(date_from).floor("us").to_pydatetime())
+        if date_to is not None:
+            clauses.append(f"{self.date_sql} <= ?")
+            params.append(pd.Timestamp(date_to).floor("us").to_pydatetime())
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def distinct(self, col, limit=MAX_DISTINCT):
+        """Sorted distinct non-null values of one column"""
+        return self.cached(("distinct", col, limit), lambda: self.sql(
+            f"SELECT DISTINCT {_q(col)} AS v FROM t WHERE {_q(col)} IS NOT NULL ORDER BY 1 LIMIT {int(limit)}")["v"].tolist())
+
+    def low_cardinality_columns(self):
+        """Text columns with few enough distinct values to act as AI Analyst filters"""
+        def build():
+            text = [c for c, t in self.types.items() if t == "VARCHAR" and c != self.date]
+            if not text:
+                return []
+            counts = self.sql("SELECT " + ", ".join(f"approx_count_distinct({_q(c)})" for c in text) + " FROM t")
+            return [c for c, n in zip(text, counts.iloc[0]) if n <= VOCAB_DISTINCT]
+        return self.cached("low_cardinality", build)
+
+    # --- Data Preview ----------------------------------------------------
+    def count(self, filters):
+        clause, params = self.where(filters)
+        return self.cached(("count", clause, tuple(params)),
+                           lambda: int(self.sql(f"SELECT count(*) AS n FROM t{clause}", params)["n"][0]))
+
+    def page(self, filters, offset, limit):
+        clause, params = self.where(filters)
+        return self.sql(f"SELECT * FROM t{clause} LIMIT {int(limit)} OFFSET {int(offset)}", params)
+
+    def export(self, filters, fmt):
+        """The filtered rows as an open, already-unlinked temp file (CSV/Parquet via COPY, XLSX streamed)"""
+        clause, params = self.where(filters)
+        fd, path = tempfile.mkstemp(prefix="mb_export_")
+        os.close(fd)
+        cur = self._con.cursor()
+        try:
+            if fmt in ("CSV", "Parquet"):
+                opts = "FORMAT CSV, HEADER true" if fmt == "CSV" else "FORMAT PARQUET"
+                cur.execute(f"COPY (SELECT * FROM t{clause}) TO '{path}' ({opts})", params)
+            else:
+                from openpyxl import Workbook
+                from engine.preview import XLSX_MAX_ROWS
+                if self.count(filters) > XLSX_MAX_ROWS:
+                    raise ValueError(f"XLSX holds at most {XLSX_MAX_ROWS:,} rows; export CSV or Parquet instead.")
+                wb = Workbook(write_only=True)
+                ws = wb.create_sheet("Data")
+                ws.append([str(c) for c in self.columns])
+                reader = cur.execute(f"SELECT * FROM t{clause}", params).fetch_record_batch(100_000)
+                for batch in reader:
+                    chunk = batch.to_pandas()
+                    for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None):
+                        ws.append(row)
+                wb.save(path)
+            f = open(path, "rb")
+        finally:
+            cur.close()
+            os.remove(path)
+        return f
+
+    # --- AI Analyst ------------------------------------------------------
+    def run_plan(self, plan):
+        """Execute a query.QueryPlan as one SQL statement (see query.run_plan for the result shape)"""
+        amt, cat = self.amount_sql, _q(self.cat) if self.cat else None
+        clause, params = self.where(plan.filters, plan.date_from, plan.date_to)
+        agg = {"sum": f"coalesce(sum({amt}), 0)", "mean": f"avg({amt})", "min": f"min({amt})",
+               "max": f"max({amt})", "count": "count(*)"}[plan.agg]
+        records = int(self.sql(f"SELECT count(*) AS n FROM t{clause}", params)["n"][0])
+
+        if plan.group_by:
+            if plan.period:
+                key = f"date_trunc('{PERIOD_UNITS[plan.period]}', {self.date_sql})"
+            else:
+                key = _q(plan.group_by)
+            clause_g, params_g = self.where(plan.filters, plan.date_from, plan.date_to, extra=[f"{key} IS NOT NULL"])
+            grouped = f"SELECT {key} AS k, {agg} AS v FROM t{clause_g} GROUP BY 1"
+            if plan.period:
+                res = self.sql(f"SELECT k, v, count(*) OVER () AS n FROM ({grouped}) WHERE v IS NOT NULL "
+                               f"ORDER BY k DESC LIMIT {int(plan.top_n or 12)}", params_g).iloc[::-1]
+                index = pd.PeriodIndex(pd.to_datetime(res["k"]), freq=plan.period)
+            else:
+                order = "ASC" if plan.ascending else "DESC"
+                res = self.sql(f"SELECT k, v, count(*) OVER () AS n FROM ({grouped}) WHERE v IS NOT NULL "
+                               f"ORDER BY v {order} LIMIT {int(plan.top_n or 10)}", params_g)
+                index = pd.Index(res["k"])
+            groups = pd.Series(res["v"].to_numpy(), index=index)
+            n_groups = int(res["n"].iloc[0]) if len(res) else 0
+            return {"kind": "groups", "groups": groups, "n_groups": n_groups, "records": records}
+
+        if plan.agg in ("max", "min") and plan.intent == "aggregate":
+            pick = "arg_max" if plan.agg == "max" else "arg_min"
+            label = f"{pick}({cat}, {amt})" if cat else "NULL"
+            res = self.sql(f"SELECT {label} AS label, {plan.agg}({amt}) AS v FROM t{clause}", params)
+            if pd.isna(res["v"][0]):
+                return {"kind": "empty", "records": records}
+            return {"kind": "row", "label": res["label"][0], "value": float(res["v"][0]), "records": records}
+
+        res = self.sql(f"SELECT {agg} AS v, coalesce(sum({amt}), 0) AS total FROM t{clause}", params)
+        value = records if plan.agg == "count" else float(res["v"][0]) if pd.notna(res["v"][0]) else np.nan
+        return {"kind": "value", "value": value, "total": float(res["total"][0]), "records": records}
+
+    def close(self):
+        self._con.close()
+
+
+def _date_sql(ds):
+    col = _q(ds.date) if ds.date else None
+    if col is None:
+        return "NULL::TIMESTAMP"
+    kind = ds.types.get(ds.date, "")
+    if kind.startswith(("DATE", "TIMESTAMP")):
+        return f"CAST({col} AS TIMESTAMP)"
+    if kind in ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT", "DOUBLE", "FLOAT"):
+        # Bare years (2023), as in charts.parse_dates
+        return (f"CASE WHEN {col} BETWEEN 1900 AND 2100 AND {col} = floor({col}) "
+                f"THEN make_timestamp(CAST({col} AS BIGINT), 1, 1, 0, 0, 0) END")
+    sample = ds.sql(f"SELECT {col} AS v FROM t WHERE {col} IS NOT NULL LIMIT 200")["v"].astype(str).to_numpy()
+    fmt = infer_date_format(sample)
+    if fmt is None:
+        return f"TRY_CAST({col} AS TIMESTAMP)"
+    return f"try_strptime(CAST({col} AS VARCHAR), '{fmt}')"
+
+
+class ColumnarCube:
+    """AggregateCube over a ColumnarDataset: the same methods, each one small grouped scan"""
+
+    def __init__(self, ds):
+        self.ds = ds
+        self.amt, self.cat, self.date = ds.amt, ds.cat, ds.date
+        self.categories = pd.Index(ds.distinct(ds.cat))
+
+    @property
+    def nbytes(self):
+        return int(self.categories.memory_usage(deep=True))
+
+    def _where(self, sel_cats, extra=()):
+        return self.ds.where({self.cat: list(sel_cats)} if sel_cats else {}, extra=extra)
+
+    def kpis(self, sel_cats=None):
+        amt = self.ds.amount_sql
+        clause, params = self._where(sel_cats)
+        key = ("kpis", clause, tuple(params))
+        r = self.ds.cached(key, lambda: self.ds.sql(
+            f"SELECT sum({amt}) AS total, count({amt}) AS n, max({amt}) AS mx, count(*) AS rows FROM t{clause}", params))
+        total = float(r["total"][0]) if pd.notna(r["total"][0]) else 0.0
+        count = int(r["n"][0])
+        return {"total": total, "mean": total / count if count else np.nan,
+                "max": float(r["mx"][0]) if count else np.nan, "records": int(r["rows"][0])}
+
+    def by_category(self, sel_cats=None):
+        amt, cat = self.ds.amount_sql, _q(self.cat)
+        clause, params = self._where(sel_cats, extra=[f"{cat} IS NOT NULL"])
+        res = self.ds.cached(("by_category", clause, tuple(params)), lambda: self.ds.sql(
+            f"SELECT {cat} AS c, sum({amt}) AS s FROM t{clause} GROUP BY 1 HAVING count({amt}) > 0 ORDER BY 1", params))
+        return pd.DataFrame({self.cat: res["c"].to_numpy(), self.amt: res["s"].to_numpy(dtype="float64")})
+
+    def top(self, sel_cats=None, n=10):
+        return self.by_category(sel_cats).sort_values(by=self.amt, ascending=True).tail(n)
+
+    def trend(self, sel_cats=None):
+        if not self.date:
+            return None
+        amt, day = self.ds.amount_sql, f"date_trunc('day', {self.ds.date_sql})"
+        clause, params = self._where(sel_cats, extra=[f"{day} IS NOT NULL", f"{amt} IS NOT NULL"])
+        res = self.ds.cached(("trend", clause, tuple(params)), lambda: self.ds.sql(
+            f"SELECT CAST({day} AS TIMESTAMP) AS d, sum({amt}) AS s FROM t{clause} GROUP BY 1 ORDER BY 1", params))
+        if res.empty:
+            return None
+        return pd.DataFrame({self.date: pd.to_datetime(res["d"]).to_numpy(), self.amt: res["s"].to_numpy()})
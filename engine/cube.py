@@ -0,0 +1,156 @@
+"""Per-dataset aggregate cube behind the Dashboard.
+
+Built once at ingest, the cube holds per-category row count, amount count,
+sum, min and max, plus per-category-per-day sums. Every Dashboard figure for
+any project selection (KPIs, top-10 bar, allocation pie, trend line) is then
+answered from these small arrays instead of rescanning the raw rows. Cubes
+of two row sets merge without rescanning either (``merged``), which is how
+appended batches update the aggregates.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+
+class AggregateCube:
+    """Category x (count, sum, min, max) and category x day sums for one dataset"""
+
+    def __init__(self, df, amt, cat, date=None, dates=None):
+        self.amt, self.cat, self.date = amt, cat, date
+        values = pd.to_numeric(df[amt], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        codes, self.categories = self._factorize(df[cat])
+        k = len(self.categories)
+        keyed = codes >= 0
+        notnull = ~np.isnan(values)
+
+        self.rows = np.bincount(codes[keyed], minlength=k)
+        self.count = np.bincount(codes[keyed & notnull], minlength=k)
+        self.sum = np.bincount(codes[keyed & notnull], weights=values[keyed & notnull], minlength=k)
+        stats = pd.Series(values[keyed]).groupby(codes[keyed]).agg(["min", "max"]).reindex(range(k))
+        self.min = stats["min"].to_numpy(dtype="float64")
+        self.max = stats["max"].to_numpy(dtype="float64")
+
+        # Rows with no category still count towards the unfiltered KPIs
+        self.total_rows = len(values)
+        self.total_count = int(notnull.sum())
+        self.total_sum = float(values[notnull].sum())
+        self.total_max = float(values[notnull].max()) if self.total_count else np.nan
+
+        self._trend_all = None
+        self.t_bucket = None
+        if date is not None:
+            days = dates if dates is not None else pd.to_datetime(df[date], errors="coerce")
+            if days.notna().any():
+                days = days.dt.floor("D").to_numpy()
+                ok = notnull & ~pd.isna(days)
+                self._trend_all = pd.Series(values[ok]).groupby(days[ok]).sum()
+                ok &= keyed
+                cell = pd.Series(values[ok]).groupby([codes[ok], days[ok]]).sum()
+                # Cells sorted by category code, so one category is one contiguous slice
+                self.t_code = cell.index.get_level_values(0).to_numpy()
+                self.t_bucket = cell.index.get_level_values(1).to_numpy()
+                self.t_sum = cell.to_numpy()
+                self.t_offsets = np.searchsorted(self.t_code, np.arange(k + 1))
+
+    def merged(self, other):
+        """A new cube covering this cube's rows and ``other``'s, in time proportional to the cube sizes"""
+        out = copy.copy(self)
+        new = other.categories.difference(self.categories, sort=False)
+        out.categories = self.categories.append(new)
+        k, grow = len(out.categories), len(new)
+        remap = out.categories.get_indexer(other.categories)
+
+        def widen(a, fill):
+            return np.concatenate([a, np.full(grow, fill, dtype=a.dtype)])
+
+        out.rows, out.count, out.sum = widen(self.rows, 0), widen(self.count, 0), widen(self.sum, 0.0)
+        out.min, out.max = widen(self.min, np.nan), widen(self.max, np.nan)
+        out.rows[remap] += other.rows
+        out.count[remap] += other.count
+        out.sum[remap] += other.sum
+        out.min[remap] = np.fmin(out.min[remap], other.min)
+        out.max[remap] = np.fmax(out.max[remap], other.max)
+
+        out.total_rows = self.total_rows + other.total_rows
+        out.total_count = self.total_count + other.total_count
+        out.total_sum = self.total_sum + other.total_sum
+        out.total_max = float(np.fmax(self.total_max, other.total_max))
+
+        trends = [c for c in (self, other) if c._trend_all is not None]
+        if len(trends) == 2:
+            out._trend_all = self._trend_all.add(other._trend_all, fill_value=0.0)
+        elif trends:
+            out._trend_all = trends[0]._trend_all
+        cells = [(c.t_code if c is self else remap[c.t_code], c.t_bucket, c.t_sum)
+                 for c in (self, other) if c.t_bucket is not None]
+        if cells:
+            codes, buckets, sums = (np.concatenate(parts) for parts in zip(*cells))
+            cell = pd.Series(sums).groupby([codes, buckets]).sum()
+            out.t_code = cell.index.get_level_values(0).to_numpy()
+            out.t_bucket = cell.index.get_level_values(1).to_numpy()
+            out.t_sum = cell.to_numpy()
+            out.t_offsets = np.searchsorted(out.t_code, np.arange(k + 1))
+        return out
+
+    @staticmethod
+    def _factorize(s):
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes = s.cat.codes.to_numpy()
+            used = np.bincount(codes[codes >= 0], minlength=len(s.cat.categories)) > 0
+            if used.all():
+                return codes, s.cat.categories
+            # Drop unobserved categories and renumber
+            remap = np.full(len(used) + 1, -1)
+            remap[:-1][used] = np.arange(used.sum())
+            return remap[codes], s.cat.categories[used]
+        codes, uniques = pd.factorize(s)
+        return codes, pd.Index(uniques)
+
+    @property
+    def nbytes(self):
+        n = sum(a.nbytes for a in (self.rows, self.count, self.sum, self.min, self.max))
+        if self.t_bucket is not None:
+            n += self.t_code.nbytes + self.t_bucket.nbytes + self.t_sum.nbytes + self.t_offsets.nbytes
+        return int(n + self.categories.memory_usage(deep=True))
+
+    def _positions(self, sel_cats):
+        if not sel_cats:
+            return None
+        pos = self.categories.get_indexer(pd.Index(list(sel_cats)))
+        return np.unique(pos[pos >= 0])
+
+    def kpis(self, sel_cats=None):
+        """Total, average, max and record count for the selection (all rows when empty)"""
+        pos = self._positions(sel_cats)
+        if pos is None:
+            total, count, rows, mx = self.total_sum, self.total_count, self.total_rows, self.total_max
+        else:
+            total, count, rows = float(self.sum[pos].sum()), int(self.count[pos].sum()), int(self.rows[pos].sum())
+            mx = float(np.nanmax(self.max[pos])) if count else np.nan
+        return {"total": total, "mean": total / count if count else np.nan, "max": mx, "records": rows}
+
+    def by_category(self, sel_cats=None):
+        """Amount sum per category as a two-column frame, in category order"""
+        pos = self._positions(sel_cats)
+        if pos is None:
+            pos = np.flatnonzero(self.count)
+        return pd.DataFrame({self.cat: self.categories[pos], self.amt: self.sum[pos]})
+
+    def top(self, sel_cats=None, n=10):
+        """The n largest categories, ascending so a horizontal bar reads top-down"""
+        return self.by_category(sel_cats).sort_values(by=self.amt, ascending=True).tail(n)
+
+    def trend(self, sel_cats=None):
+        """Daily amount sums for the selection, or None when there is no usable date column"""
+        if self._trend_all is None:
+            return None
+        pos = self._positions(sel_cats)
+        if pos is None:
+            s = self._trend_all
+        else:
+            starts, lengths = self.t_offsets[pos], self.t_offsets[pos + 1] - self.t_offsets[pos]
+            # Gather the contiguous per-category slices without a Python loop
+            idx = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            s = pd.Series(self.t_sum[idx]).groupby(self.t_bucket[idx]).sum()
+        return pd.DataFrame({self.date: s.index, self.amt: s.to_numpy()})
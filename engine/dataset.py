@@ -0,0 +1,115 @@
+"""Parsed upload plus the column mapping detected for it."""
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from engine.cache import Resizable
+from engine.charts import parse_dates
+from engine.cube import AggregateCube
+
+
+def deep_sizeof(obj):
+    """Approximate bytes held by a derived structure (arrays, frames, nested dicts/lists/tuples)"""
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, np.ndarray) or hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(deep_sizeof(k) + deep_sizeof(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(deep_sizeof(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+class Dataset(Resizable):
+    """A parsed ledger and its detected Amount / Category / Date / Status columns"""
+
+    # True for engine.columnar.ColumnarDataset, whose rows stay on disk (df is None)
+    columnar = False
+
+    def __init__(self, df, mapping, digest=None, name=None, report=None, parts=None):
+        # Appended datasets (engine.append) hold their batches as parts and concatenate them on first use
+        self.parts = parts if parts is not None else ([] if df is None else [df])
+        self._df = df
+        self.amt, self.cat, self.date, self.status = mapping
+        self.digest = digest
+        self.name = name
+        self.report = report
+        # Workspace datasets: (label, rows, seconds) per loaded part, and labels of skipped sheets
+        self.sources = []
+        self.skipped = []
+        # Appended batches: one engine.append.AppendReport each, oldest first
+        self.batches = []
+        self._nbytes = report.final_bytes if report is not None else None
+        # Cube, parsed dates and derived indexes, built after parsing (charged to the parse cache)
+        self._extra_nbytes = 0
+        self._cube = None
+        self._dates = None
+        self._derived = {}
+        self._lock = threading.Lock()
+        self._concat_lock = threading.Lock()
+
+    @property
+    def mapping(self):
+        return self.amt, self.cat, self.date, self.status
+
+    @property
+    def df(self):
+        """The rows as one frame (None for a columnar dataset)"""
+        if self._df is None and self.parts:
+            with self._concat_lock:
+                if self._df is None:
+                    from engine.ingest import concat_chunks
+                    first = self.parts[0]
+                    cat_cols = [c for c in first.columns if isinstance(first[c].dtype, pd.CategoricalDtype)]
+                    self._df = concat_chunks(self.parts, cat_cols)
+                    self.parts = [self._df]
+        return self._df
+
+    @property
+    def columns(self):
+        return list(self.parts[0].columns) if self.parts else list(self.df.columns)
+
+    @property
+    def cube(self):
+        """Aggregate cube for the Dashboard, built on first use (None without amount/category)"""
+        if self._cube is None and self.amt and self.cat:
+            self._cube = AggregateCube(self.df, self.amt, self.cat, self.date, dates=self.dates)
+            self._grow(self._cube.nbytes)
+        return self._cube
+
+    @property
+    def dates(self):
+        """The date column parsed once (unparseable values become NaT), or None"""
+        if self._dates is None and self.date:
+            self._dates = parse_dates(self.df[self.date])
+            self._grow(int(self._dates.nbytes))
+        return self._dates
+
+    def derived(self, key, build):
+        """Memoise a structure derived from this dataset (lookup tables, indexes...); its size is charged"""
+        with self._lock:
+            if key in self._derived:
+                return self._derived[key]
+            value = self._derived[key] = build(self)
+        self._grow(deep_sizeof(value))
+        return value
+
+    def _grow(self, nbytes):
+        with self._lock:
+            self._extra_nbytes += nbytes
+        self._grew(nbytes)
+
+    @property
+    def nbytes(self):
+        """Deep memory footprint: rows (measured once; deep=True is slow on object columns) plus derived structures"""
+        if self._nbytes is None:
+            self._nbytes = sum(int(p.memory_usage(index=True, deep=True).sum()) for p in self.parts)
+        return self._nbytes + self._extra_nbytes
+
+    def __len__(self):
+        return sum(len(p) for p in self.parts) if self._df is None else len(self._df)
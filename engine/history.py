@@ -0,0 +1,105 @@
+"""Bounded chat history backed by an append-only activity log.
+
+Every chat turn is appended as one compact JSON line to a shared log file
+(all sessions, one file). A session keeps only its last ``WINDOW`` messages
+in memory plus the byte offset of each of its lines in the log, so older
+turns cost 8 bytes each and are read back from disk only when the user pages
+to them. The AI Analyst view renders one page at a time, and the same log
+is what "Export Activity Logs" downloads.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from array import array
+from collections import deque
+
+LOG_PATH = os.environ.get("MB_ACTIVITY_LOG", os.path.join(tempfile.gettempdir(), "magicbus-activity.jsonl"))
+WINDOW = 50
+PAGE_SIZE = 20
+
+
+class ActivityLog:
+    """Append-only JSON-lines file shared by every session"""
+
+    def __init__(self, path=LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, entry):
+        """Write one entry; returns its byte offset in the file"""
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(line)
+        return offset
+
+    def read(self, offsets):
+        """Entries at the given byte offsets, in the order given"""
+        if not offsets:
+            return []
+        with open(self.path, "rb") as f:
+            out = []
+            for offset in offsets:
+                f.seek(offset)
+                out.append(json.loads(f.readline()))
+        return out
+
+    def export(self, session=None):
+        """The log as JSON-lines bytes, optionally only one session's entries"""
+        if not os.path.exists(self.path):
+            return b""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if session is None:
+            return data
+        tag = f'"session":"{session}"'.encode()
+        return b"".join(line for line in data.splitlines(keepends=True) if tag in line)
+
+    @property
+    def nbytes(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+
+ACTIVITY_LOG = ActivityLog()
+
+
+class ChatHistory:
+    """One session's chat: the last ``window`` messages in memory, the rest on disk"""
+
+    def __init__(self, user=None, greeting=None, log=None, window=WINDOW):
+        self.session = uuid.uuid4().hex[:12]
+        self.user = user
+        self.greeting = greeting
+        self.log = log or ACTIVITY_LOG
+        self._recent = deque(maxlen=window)
+        self._offsets = array("q")
+
+    def append(self, role, content):
+        msg = {"role": role, "content": content}
+        entry = {"ts": round(time.time(), 3), "session": self.session, "user": self.user, **msg}
+        self._offsets.append(self.log.append(entry))
+        self._recent.append(msg)
+        return msg
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def last(self, n):
+        """The newest ``n`` messages, oldest first; turns outside the window come from the log"""
+        n = min(n, len(self))
+        in_memory = min(n, len(self._recent))
+        older = n - in_memory
+        head = []
+        if older:
+            start = len(self) - n
+            head = [{"role": e["role"], "content": e["content"]}
+                    for e in self.log.read(self._offsets[start:start + older])]
+        return head + list(self._recent)[len(self._recent) - in_memory:]
+
+    def export(self):
+        return self.log.export(self.session)
@@ -0,0 +1,235 @@
+"""Chunked, dtype-optimised CSV/Excel ingestion.
+
+A first pass reads a bounded sample to detect the column mapping, spot
+amounts stored as currency text and decide which text columns are
+low-cardinality. The file is then streamed in chunks: those text columns are
+parsed straight into ``category``, currency text is converted to numbers and
+numeric columns are downcast chunk by chunk, so the full float64/object
+frame never exists. A currency column other than the amount keeps its text
+if any non-empty value fails to parse, so nothing is silently turned into NaN.
+"""
+import io
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import (is_bool_dtype, is_float_dtype, is_integer_dtype,
+                              is_numeric_dtype, is_object_dtype, is_string_dtype)
+from pandas.api.types import union_categoricals
+
+from engine.dataset import Dataset
+from engine.jobs import Progress
+from engine.schema import auto_map_columns, infer_schema, parse_currency
+from engine.timing import stage
+
+SAMPLE_ROWS = 10_000
+CHUNK_ROWS = 250_000
+# Text columns whose sample has fewer distinct values than this share of rows become category
+CATEGORY_RATIO = 0.5
+
+
+class IngestReport:
+    """Rows, wall time and memory high-water mark of one ingestion"""
+
+    def __init__(self, rows=0, seconds=0.0, peak_bytes=0, final_bytes=0, chunks=0, unparsed=0):
+        self.rows = rows
+        self.seconds = seconds
+        self.peak_bytes = peak_bytes
+        self.final_bytes = final_bytes
+        self.chunks = chunks
+        self.unparsed = unparsed      # non-empty amount values that are not numbers (read as missing)
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {"rows": self.rows, "seconds": self.seconds, "rows_per_sec": self.rows_per_sec,
+                "peak_mb": self.peak_bytes / 1024 / 1024, "final_mb": self.final_bytes / 1024 / 1024,
+                "chunks": self.chunks, "unparsed": self.unparsed}
+
+    def __str__(self):
+        return (f"{self.rows:,} rows in {self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s) · "
+                f"peak {self.peak_bytes / 1024 / 1024:,.1f} MB → {self.final_bytes / 1024 / 1024:,.1f} MB"
+                + (f" · {self.unparsed:,} amount value(s) not numeric" if self.unparsed else ""))
+
+
+def _is_text(s):
+    return is_object_dtype(s) or (is_string_dtype(s) and not isinstance(s.dtype, pd.CategoricalDtype))
+
+
+def category_columns(sample, mapping, exclude=()):
+    """Text columns worth storing as category: the mapped cat/status plus any low-cardinality text"""
+    _, cat, _, status = mapping
+    cols = []
+    for c in sample.columns:
+        s = sample[c]
+        if not _is_text(s) or c in exclude:
+            continue
+        if c in (cat, status) or s.nunique(dropna=True) <= max(1, len(s) * CATEGORY_RATIO):
+            cols.append(c)
+    return cols
+
+
+def _unparsed(text, values):
+    """Mask of non-empty text values that did not parse"""
+    return values.isna() & text.notna() & (text.astype("string").str.strip() != "")
+
+
+def normalize_currency(df, cols, amt=None):
+    """Replace currency-text columns ('₹1,23,456.00', '(5,000)') with float64 amounts.
+
+    Returns ``(df, kept, unparsed)``: columns other than ``amt`` with a
+    non-empty value that does not parse are left as text and listed in
+    ``kept``; ``unparsed`` counts the amount values that became missing.
+    """
+    out, kept, unparsed = {}, [], 0
+    for c in cols:
+        if c not in df.columns:
+            continue
+        values = parse_currency(df[c])
+        bad = int(_unparsed(df[c], values).sum())
+        if bad and c != amt:
+            kept.append(c)
+            continue
+        unparsed += bad
+        out[c] = values
+    return (df.assign(**out) if out else df), kept, unparsed
+
+
+def downcast(df, amt=None):
+    """Shrink numeric columns in place of a fresh frame.
+
+    Integers go to the smallest signed type. Floats that hold only whole
+    numbers become integers; other floats become float32 when that is exact.
+    The amount column is never narrowed to float32, so paisa-level totals
+    stay exact.
+    """
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        if is_bool_dtype(s) or not is_numeric_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+            continue
+        if is_integer_dtype(s):
+            out[c] = pd.to_numeric(s, downcast="integer")
+        elif is_float_dtype(s):
+            v = s.to_numpy()
+            if not np.isnan(v).any() and np.array_equal(v, np.trunc(v)) and np.abs(v).max(initial=0) < 2**62:
+                out[c] = pd.to_numeric(s.astype("int64"), downcast="integer")
+            elif c != amt and s.dtype != np.float32:
+                f32 = v.astype(np.float32)
+                if np.array_equal(f32.astype(v.dtype), v, equal_nan=True):
+                    out[c] = pd.Series(f32, index=s.index, name=c)
+    return df.assign(**out) if out else df
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def concat_chunks(chunks, cat_cols):
+    """Concatenate optimised chunks, unioning categories and widening mixed int/float columns"""
+    if len(chunks) == 1:
+        return chunks[0]
+    cats = {c: union_categoricals([ch[c] for ch in chunks], ignore_order=True) for c in cat_cols}
+    widen = {}
+    for c in chunks[0].columns:
+        if c in cats:
+            continue
+        kinds = {ch[c].dtype.kind for ch in chunks}
+        if kinds <= {"i", "u", "f"} and "f" in kinds and len({ch[c].dtype for ch in chunks}) > 1:
+            widen[c] = "float64"
+    rest = [ch.drop(columns=list(cats)).astype(widen) if (cats or widen) else ch for ch in chunks]
+    df = pd.concat(rest, ignore_index=True)
+    for c, values in cats.items():
+        df[c] = pd.Categorical(values)
+    return df[list(chunks[0].columns)]
+
+
+def read_table(name, data, mapper=auto_map_columns, chunk_rows=CHUNK_ROWS, sheet_name=0, progress=None):
+    """Parse CSV/Excel bytes into an optimised DataFrame.
+
+    ``mapper`` is the column auto-mapper (``auto_map_columns``); it is run on
+    the sample so the detected cat/status columns can be read as category.
+    Columns the schema profile flags as currency text are converted to
+    numbers. ``sheet_name`` picks the Excel sheet. ``progress`` (a
+    ``jobs.Progress``) receives bytes read and rows parsed after every chunk
+    and can cancel between chunks. Returns ``(df, mapping, report)``.
+    """
+    t0 = time.perf_counter()
+    report = IngestReport()
+    progress = progress or Progress()
+    progress.update(phase="Sampling", bytes_total=len(data))
+
+    if name.lower().endswith(".csv"):
+        sample = pd.read_csv(io.BytesIO(data), nrows=SAMPLE_ROWS)
+        progress.check()
+        progress.update(phase="Mapping columns")
+        with stage("mapping"):
+            mapping = mapper(sample)
+            money = infer_schema(sample).currency_columns
+        cat_cols = category_columns(sample, mapping, exclude=money)
+        del sample
+
+        chunks, held = [], 0
+        # Text of the non-amount currency columns, in case a later chunk has a value that does not parse
+        texts, kept = {c: [] for c in money if c != mapping[0]}, set()
+        buf = io.BytesIO(data)
+        reader = pd.read_csv(buf, chunksize=chunk_rows, dtype={c: "category" for c in cat_cols})
+        progress.update(phase="Parsing rows")
+        for raw in reader:
+            progress.check()
+            raw_bytes = _frame_bytes(raw)
+            for c, parts in texts.items():
+                parts.append(raw[c])
+            chunk, failed, bad = normalize_currency(raw, [c for c in money if c not in kept], mapping[0])
+            kept.update(failed)
+            report.unparsed += bad
+            chunk = downcast(chunk, amt=mapping[0])
+            del raw
+            held += _frame_bytes(chunk)
+            report.peak_bytes = max(report.peak_bytes, held + raw_bytes)
+            report.rows += len(chunk)
+            report.chunks += 1
+            chunks.append(chunk)
+            progress.update(bytes_done=buf.tell(), rows=report.rows)
+        progress.update(phase="Combining chunks")
+        if not chunks:
+            df = normalize_currency(pd.read_csv(io.BytesIO(data)), money, mapping[0])[0]
+        else:
+            df = concat_chunks(chunks, cat_cols)
+            for c in kept:
+                df[c] = pd.concat(texts[c], ignore_index=True)
+        del chunks, texts
+    else:
+        progress.update(phase="Reading workbook")
+        raw = pd.read_excel(io.BytesIO(data), sheet_name=sheet_name)
+        raw_bytes = _frame_bytes(raw)
+        progress.check()
+        progress.update(phase="Mapping columns", bytes_done=len(data), rows=len(raw))
+        with stage("mapping"):
+            mapping = mapper(raw)
+            money = infer_schema(raw).currency_columns
+        cat_cols = category_columns(raw.head(SAMPLE_ROWS), mapping, exclude=money)
+        df, _, report.unparsed = normalize_currency(raw.astype({c: "category" for c in cat_cols}), money, mapping[0])
+        df = downcast(df, amt=mapping[0])
+        del raw
+        held = 0
+        report.rows, report.chunks = len(df), 1
+        report.peak_bytes = raw_bytes
+
+    report.final_bytes = _frame_bytes(df)
+    report.peak_bytes = max(report.peak_bytes, held + report.final_bytes)
+    report.seconds = time.perf_counter() - t0
+    return df, mapping, report
+
+
+def load_table(name, data, digest=None, progress=None):
+    """Parse one CSV/Excel upload into a Dataset with its Dashboard aggregates built"""
+    df, mapping, report = read_table(name, data, progress=progress)
+    dataset = Dataset(df, mapping, digest=digest, name=name, report=report)
+    if progress is not None:
+        progress.check()
+        progress.update(phase="Building aggregates")
+    dataset.cube  # build the Dashboard aggregates once, at ingest
+    return dataset
@@ -0,0 +1,157 @@
+"""Background ingestion jobs with real progress and cancellation.
+
+A job runs a parse function on a daemon thread and hands it a ``Progress``
+that the parser updates as it goes (bytes read, rows parsed, pages
+extracted) and checks for cancellation between chunks. Jobs are registered
+by content hash, so every session uploading the same file watches the same
+job. The finished result is published in one step (into the parse cache),
+so readers see either the previous dataset or the complete new one, never a
+half-built one.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+MAX_FINISHED = 32
+
+
+class Cancelled(Exception):
+    """Raised inside a job when the user cancelled it"""
+
+
+class Progress:
+    """Thread-safe counters a parser updates while it works"""
+
+    def __init__(self, bytes_total=0):
+        self.phase = "Queued"
+        self.bytes_total = bytes_total
+        self.bytes_done = 0
+        self.rows = 0
+        self.pages_done = 0
+        self.pages_total = 0
+        self.started = time.perf_counter()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def update(self, **fields):
+        with self._lock:
+            for k, v in fields.items():
+                setattr(self, k, v)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        """Raise ``Cancelled`` if the job was cancelled; parsers call this between chunks"""
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    @property
+    def fraction(self):
+        """Share of the work done, from pages when known, else from bytes"""
+        with self._lock:
+            if self.pages_total:
+                return min(1.0, self.pages_done / self.pages_total)
+            if self.bytes_total:
+                return min(1.0, self.bytes_done / self.bytes_total)
+            return 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return {"phase": self.phase, "bytes_done": self.bytes_done, "bytes_total": self.bytes_total,
+                    "rows": self.rows, "pages_done": self.pages_done, "pages_total": self.pages_total,
+                    "seconds": time.perf_counter() - self.started}
+
+
+class Job:
+    """One parse running on its own daemon thread"""
+
+    def __init__(self, key, label, parse, publish=None, bytes_total=0):
+        self.key = key
+        self.label = label
+        self.progress = Progress(bytes_total)
+        self.state = "running"          # 'running', 'done', 'failed' or 'cancelled'
+        self.result = None
+        self.error = None
+        self._parse = parse
+        self._publish = publish
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"ingest-{key[:12]}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            result = self._parse(self.progress)
+            # Hand the result over in one step; keep it only if the publisher did not take it
+            taken = self._publish(result) if self._publish else False
+            self.result = None if taken else result
+            self.state = "done"
+        except Cancelled:
+            self.state = "cancelled"
+        except Exception as e:
+            self.error = e
+            self.state = "failed" if not self.progress.cancelled else "cancelled"
+        finally:
+            self._parse = self._publish = None
+            self._finished.set()
+
+    def cancel(self):
+        self.progress.cancel()
+
+    @property
+    def running(self):
+        return not self._finished.is_set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+
+class JobRegistry:
+    """Running and recently finished jobs by content key, shared by every session"""
+
+    def __init__(self, max_finished=MAX_FINISHED):
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def start(self, key, label, parse, publish=None, bytes_total=0):
+        """Start ``parse(progress)`` for ``key`` unless a job for it is already running"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.running:
+                return job
+            job = Job(key, label, parse, publish, bytes_total)
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            self._prune()
+        return job.start()
+
+    def discard(self, key):
+        with self._lock:
+            job = self._jobs.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def running(self):
+        with self._lock:
+            return [j for j in self._jobs.values() if j.running]
+
+    def _prune(self):
+        # Caller holds self._lock; running jobs are never dropped
+        finished = [k for k, j in self._jobs.items() if not j.running]
+        for k in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[k]
+
+
+JOBS = JobRegistry()
@@ -0,0 +1,200 @@
+"""Parallel, cached page-level PDF text extraction.
+
+Pages are fanned out in small ranges to a process pool (pdfplumber is pure
+Python, so threads would serialise on the GIL). Each page's text is cached by
+document hash and page number, and a ``PdfDocument`` exposes the pages as a
+lazy sequence: readers block only on the page they need, so answers can start
+before the last page has been extracted.
+"""
+import os
+import tempfile
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from engine.cache import ParseCache, Resizable
+from engine.pool import cpu_count, process_pool
+from engine.search import PassageIndex, search
+
+PAGES_PER_TASK = 8
+# Text of every extracted page, keyed "<sha256>:<page>", shared by all sessions
+PAGE_CACHE = ParseCache(budget_mb=float(os.environ.get("MB_PAGE_CACHE_MB", 128)), sizeof=len)
+
+
+def _pdfplumber():
+    """pdfplumber, imported on first use (it is slow to import and only PDFs need it)"""
+    try:
+        import pdfplumber
+    except ImportError:
+        raise ImportError("PDF support requires 'pdfplumber'") from None
+    return pdfplumber
+
+
+def _executor(n_pages):
+    """Process pool for real documents; a single thread when it cannot pay off"""
+    if n_pages <= PAGES_PER_TASK or cpu_count() < 2:
+        return ThreadPoolExecutor(max_workers=1)
+    return process_pool()
+
+
+def extract_pages(path, start, stop):
+    """Worker: text of pages [start, stop) of the PDF at ``path`` (image-only pages give '')"""
+    with _pdfplumber().open(path) as pdf:
+        return [(i, pdf.pages[i].extract_text() or "") for i in range(start, stop)]
+
+
+class PdfDocument(Resizable):
+    """Lazy sequence of page texts for one PDF, filled in by background extraction.
+
+    ``nbytes`` starts at the file size and grows with each extracted page and
+    its search index entries, which are charged to the cache holding it. If a
+    page range fails, its pages read as empty, ``failed`` lists them and the
+    document leaves the cache, so the next upload of the file reads it again.
+    """
+
+    def __init__(self, data, digest, name=None):
+        pdfplumber = _pdfplumber()
+        self.digest = digest
+        self.name = name
+        self.nbytes = len(data)
+        fd, self._path = tempfile.mkstemp(prefix=f"mb_{digest[:12]}_", suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with pdfplumber.open(self._path) as pdf:
+            n = len(pdf.pages)
+        self._pages = [PAGE_CACHE.get(f"{digest}:{i}") for i in range(n)]
+        # Search index is built alongside extraction, page by page
+        self.index = PassageIndex(name)
+        for i, text in enumerate(self._pages):
+            if text is not None:
+                self.nbytes += len(text) + self.index.add_page(i, text)
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._futures = []
+        self._ranges = {}
+        self.error = None
+        self.failed = []
+        self.cancelled = False
+        self._start()
+
+    def _start(self):
+        missing = [i for i, t in enumerate(self._pages) if t is None]
+        ranges, i = [], 0
+        while i < len(missing):
+            # Contiguous runs of missing pages, at most PAGES_PER_TASK long
+            j = i
+            while j + 1 < len(missing) and missing[j + 1] == missing[j] + 1 and j + 1 - i < PAGES_PER_TASK:
+                j += 1
+            ranges.append((missing[i], missing[j] + 1))
+            i = j + 1
+        if not ranges:
+            self._cleanup()
+            return
+        self._pending = len(ranges)
+        pool = _executor(len(missing))
+        for start, stop in ranges:
+            future = pool.submit(extract_pages, self._path, start, stop)
+            self._futures.append(future)
+            self._ranges[future] = (start, stop)
+            future.add_done_callback(self._collect)
+        if isinstance(pool, ThreadPoolExecutor):
+            pool.shutdown(wait=False)
+
+    def _collect(self, future):
+        try:
+            pages = future.result()
+        except CancelledError:
+            pages = []
+        except Exception as e:
+            pages = []
+            self.error = e
+            self.failed.extend(range(*self._ranges[future]))
+        added = 0
+        with self._cond:
+            for i, text in pages:
+                self._pages[i] = text
+                added += len(text) + self.index.add_page(i, text)
+                PAGE_CACHE.put(f"{self.digest}:{i}", text)
+            self.nbytes += added
+            self._pending -= 1
+            if self._pending == 0:
+                # A failed range leaves its pages empty rather than blocking readers forever
+                self._pages = [t if t is not None else "" for t in self._pages]
+                self._cleanup()
+            self._cond.notify_all()
+        if added:
+            self._grew(added)
+        if self.failed and self.done:
+            self.release()
+
+    def _cleanup(self):
+        try:
+            os.remove(self._path)
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self._pages)
+
+    def __getitem__(self, i):
+        """Text of page ``i``, waiting for it if it is still being extracted"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pages[i] is not None)
+            return self._pages[i]
+
+    def __iter__(self):
+        for i in range(len(self._pages)):
+            yield self[i]
+
+    def cancel(self):
+        """Stop extracting: queued page ranges are dropped and read as empty pages"""
+        self.cancelled = True
+        for future in self._futures:
+            future.cancel()
+
+    def wait(self, timeout=None):
+        """Block until every page is extracted; False if ``timeout`` ran out first"""
+        with self._cond:
+            return self._cond.wait_for(lambda: all(t is not None for t in self._pages), timeout)
+
+    @property
+    def pages_ready(self):
+        return sum(t is not None for t in self._pages)
+
+    @property
+    def done(self):
+        return self.pages_ready == len(self._pages)
+
+    def head(self, n_chars):
+        """First ``n_chars`` of the document, reading only as many pages as needed"""
+        out, size = [], 0
+        for text in self:
+            out.append(text)
+            size += len(text) + 1
+            if size >= n_chars:
+                break
+        return "\n".join(out)[:n_chars]
+
+    @property
+    def text(self):
+        """Whole document text (waits for every page)"""
+        return "\n".join(self)
+
+
+def answer(docs, question):
+    """Markdown answer to a chat question about one or more loaded PDFs"""
+    if "summary" in question.lower():
+        if len(docs) == 1:
+            return f"**PDF Summary:**\n{docs[0].head(600)}..."
+        return "**PDF Summary:**\n" + "\n\n".join(f"**{d.name}:** {d.head(300)}..." for d in docs)
+    # One ranked search across every loaded PDF
+    hits = search([d.index for d in docs], question, k=3)
+    where = lambda h: f"{h.doc}, p.{h.page}" if len(docs) > 1 else f"p.{h.page}"
+    matches = [f"📄 {where(h)}, line {h.line}: {h.text}" for h in hits]
+    resp = "Found:\n" + "\n".join(matches) if matches else "No text match found."
+    ready, pages = sum(d.pages_ready for d in docs), sum(len(d) for d in docs)
+    if ready < pages:
+        resp += f"\n\n_Still reading: {ready}/{pages} pages indexed._"
+    for d in docs:
+        if d.failed:
+            resp += f"\n\n_⚠️ {d.name}: {len(d.failed)} of {len(d)} pages could not be read and were not searched._"
+    return resp
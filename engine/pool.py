@@ -0,0 +1,27 @@
+"""Shared worker process pool for CPU-bound parsing."""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_pool = None
+_lock = threading.Lock()
+
+
+def cpu_count():
+    return os.cpu_count() or 1
+
+
+def mp_context():
+    """Fork where the platform allows it: under spawn, each worker would
+    re-execute the Streamlit script, which Streamlit installs as __main__."""
+    return multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+
+
+def process_pool():
+    """Lazily created process pool, one per server process"""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=cpu_count(), mp_context=mp_context())
+        return _pool
@@ -0,0 +1,125 @@
+"""Index-backed filtering, paging and on-demand export for the Data Preview.
+
+Filter columns get a value -> sorted row-position map built once per
+dataset, so a filter change is a dictionary lookup plus an intersection of
+position arrays: no boolean masks over every row and no copies of the frame.
+Only the visible page is materialised, and exports are written chunk by
+chunk to a spooled temp file only when the user asks for them. Columnar
+(on-disk) datasets answer the same calls with filtered SQL scans instead.
+"""
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+EXPORT_CHUNK_ROWS = 100_000
+XLSX_MAX_ROWS = 1_048_575
+EXPORT_FORMATS = {
+    "CSV": ("magic_bus_data.csv", "text/csv"),
+    "Parquet": ("magic_bus_data.parquet", "application/vnd.apache.parquet"),
+    "XLSX": ("magic_bus_data.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def _build_value_index(s):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes, values = s.cat.codes.to_numpy(), s.cat.categories
+    else:
+        codes, values = pd.factorize(s)
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0], minlength=len(values))
+    # Missing values (code -1) sort first; skip past them
+    offsets = np.concatenate([[0], np.cumsum(counts)]) + int((codes < 0).sum())
+    return {v: order[offsets[i]:offsets[i + 1]] for i, v in enumerate(values) if counts[i]}
+
+
+def value_index(dataset, col):
+    """Value -> sorted row positions for one column, built once per dataset"""
+    return dataset.derived(("value_index", col), lambda ds: _build_value_index(ds.df[col]))
+
+
+def filter_values(dataset, col):
+    """Options for a filter select box: the distinct values of one column"""
+    if dataset.columnar:
+        return dataset.distinct(col)
+    return list(value_index(dataset, col))
+
+
+def filter_positions(dataset, filters):
+    """Row positions matching every ``{column: value}`` filter, or None for all rows.
+
+    For a columnar dataset the filters themselves are the selection.
+    """
+    if dataset.columnar:
+        return dict(filters) or None
+    positions = None
+    for col, value in filters.items():
+        rows = value_index(dataset, col).get(value, np.array([], dtype=np.int64))
+        positions = rows if positions is None else np.intersect1d(positions, rows, assume_unique=True)
+    return positions
+
+
+def n_rows(dataset, positions):
+    if dataset.columnar:
+        return dataset.count(positions or {})
+    return len(dataset.df) if positions is None else len(positions)
+
+
+def page(dataset, positions, page_no, page_size):
+    """The rows of one page (0-based), materialised on their own"""
+    start = page_no * page_size
+    if dataset.columnar:
+        return dataset.page(positions or {}, start, page_size)
+    if positions is None:
+        return dataset.df.iloc[start:start + page_size]
+    return dataset.df.iloc[positions[start:start + page_size]]
+
+
+def _chunks(dataset, positions, chunk_rows):
+    total = n_rows(dataset, positions)
+    for start in range(0, total, chunk_rows):
+        yield page(dataset, positions, start // chunk_rows, chunk_rows)
+
+
+def export_file(dataset, positions, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write the filtered rows to a spooled temp file in chunks and return it rewound.
+
+    The file stays in memory up to a few MB and then rolls over to disk, so a
+    large export is never held as one bytes object.
+    """
+    if dataset.columnar:
+        return dataset.export(positions or {}, fmt)
+    out = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    if fmt == "CSV":
+        for i, chunk in enumerate(_chunks(dataset, positions, chunk_rows)):
+            out.write(chunk.to_csv(index=False, header=i == 0).encode("utf-8"))
+        if n_rows(dataset, positions) == 0:
+            out.write(dataset.df.head(0).to_csv(index=False).encode("utf-8"))
+    elif fmt == "Parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        for chunk in _chunks(dataset, positions, chunk_rows):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out, table.schema)
+            writer.write_table(table)
+        if writer is None:
+            pq.write_table(pa.Table.from_pandas(dataset.df.head(0), preserve_index=False), out)
+        else:
+            writer.close()
+    elif fmt == "XLSX":
+        from openpyxl import Workbook
+        if n_rows(dataset, positions) > XLSX_MAX_ROWS:
+            raise ValueError(f"XLSX holds at most {XLSX_MAX_ROWS:,} rows; export CSV or Parquet instead.")
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Data")
+        ws.append([str(c) for c in dataset.df.columns])
+        for chunk in _chunks(dataset, positions, chunk_rows):
+            for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None):
+                ws.append(row)
+        wb.save(out)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    out.seek(0)
+    return out
@@ -0,0 +1,308 @@
+"""Intent-to-pandas query engine for the AI Analyst.
+
+A question is parsed into a ``QueryPlan`` (aggregate, optional filters on
+category/status/other low-cardinality columns and a date range, optional
+group-by and top-N). Relative ranges ("last 3 months", "first 2 years") are
+counted from the latest or earliest date in the ledger. Each plan runs as one vectorised pandas operation and
+its result is memoised per dataset hash and normalised plan, so repeated or
+rephrased questions come back instantly.
+"""
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+import pandas as pd
+
+QueryPlan = namedtuple("QueryPlan", "intent agg filters date_from date_to group_by period top_n ascending")
+QueryPlan.__doc__ = """Normalised question: filters is a sorted tuple of (column, (values...))"""
+
+GREETINGS = {"hi", "hello", "namaste", "hey"}
+AGG_WORDS = [
+    ("count", {"count", "many", "number", "records", "transactions"}),
+    ("mean", {"average", "avg", "mean"}),
+    ("min", {"min", "minimum", "lowest", "least", "smallest", "bottom"}),
+    ("max", {"max", "maximum", "highest", "largest", "biggest", "most", "top"}),
+    ("sum", {"total", "sum", "spend", "spent", "spending", "volume", "amount", "expenditure", "cost"}),
+]
+PERIODS = {"day": "D", "daily": "D", "date": "D", "week": "W", "weekly": "W", "month": "M", "monthly": "M",
+           "quarter": "Q", "quarterly": "Q", "year": "Y", "yearly": "Y", "annual": "Y"}
+MONTHS = {m: i for i, m in enumerate(["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+# Whole month names or their abbreviations only ("mar" / "march", never "marketing")
+MONTH_RE = (r"\b(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+            r"sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b\.?\s+((?:19|20)\d{2})\b")
+# "last 3 months", "first 2 years": a date range, not a bottom/top-N
+RELATIVE_RE = r"\b(last|past|previous|first)\s+(\d+)\s+(day|week|month|quarter|year)s?\b"
+RELATIVE_UNITS = {"day": pd.DateOffset(days=1), "week": pd.DateOffset(weeks=1), "month": pd.DateOffset(months=1),
+                  "quarter": pd.DateOffset(months=3), "year": pd.DateOffset(years=1)}
+MAX_NGRAM = 6
+MEMO_SIZE = 2048
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _norm(text):
+    return tuple(re.findall(r"\w+", str(text).lower()))
+
+
+def _vocabulary(dataset):
+    """Normalised value -> (column, value) for the category/status and other low-cardinality columns"""
+    vocab = {}
+    cols = [c for c in (dataset.cat, dataset.status) if c]
+    if dataset.columnar:
+        cols += [c for c in dataset.low_cardinality_columns() if c not in cols]
+    else:
+        df = dataset.df
+        cols += [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype) and c not in cols and c != dataset.date]
+    for c in cols:
+        if dataset.columnar:
+            values = dataset.distinct(c)
+        elif isinstance(dataset.df[c].dtype, pd.CategoricalDtype):
+            values = dataset.df[c].cat.categories
+        else:
+            values = dataset.df[c].dropna().unique()
+        for v in values:
+            key = _norm(v)
+            if key and not (len(key) == 1 and key[0].isdigit()):
+                vocab.setdefault(key, (c, v))
+    return vocab
+
+
+def _column_words(dataset):
+    """Word -> column, used to resolve 'by donor' / 'per status' to a real column.
+
+    The amount is what gets aggregated, never a grouping ('top 3 projects by
+    spend'), and the date is grouped through PERIODS ('per month').
+    """
+    words = {}
+    for c in dataset.columns:
+        if c in (dataset.amt, dataset.date):
+            continue
+        for w in _norm(c):
+            words.setdefault(w, c)
+            words.setdefault(w.rstrip("s"), c)
+    for w in ("project", "projects", "category", "categories"):
+        if dataset.cat:
+            words.setdefault(w, dataset.cat)
+    return words
+
+
+def _date_range(q):
+    """(from, to) timestamps from 'in 2024', 'march 2024', 'since 2023', 'between 2022 and 2023'"""
+    years = [int(y) for y in re.findall(r"\b((?:19|20)\d{2})\b", q)]
+    if not years:
+        return None, None
+    month = re.search(MONTH_RE, q)
+    if month:
+        start = pd.Timestamp(int(month.group(2)), MONTHS[month.group(1)[:3]], 1)
+        return start, start + pd.offsets.MonthEnd(1) + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+    lo, hi = pd.Timestamp(min(years), 1, 1), pd.Timestamp(max(years) + 1, 1, 1) - pd.Timedelta(1, "ns")
+    if re.search(r"\b(since|after|from)\s+(?:19|20)\d{2}\b", q) and len(years) == 1:
+        return lo, None
+    if re.search(r"\b(before|until|till|upto|up to)\s+(?:19|20)\d{2}\b", q) and len(years) == 1:
+        return None, pd.Timestamp(years[0], 1, 1) - pd.Timedelta(1, "ns")
+    return lo, hi
+
+
+def _date_extent(dataset):
+    """(earliest, latest) parsed date in the ledger, or (None, None)"""
+    if dataset.columnar:
+        res = dataset.sql(f"SELECT min({dataset.date_sql}) AS lo, max({dataset.date_sql}) AS hi FROM t")
+        lo, hi = res["lo"][0], res["hi"][0]
+    else:
+        lo, hi = dataset.dates.min(), dataset.dates.max()
+    return (None, None) if pd.isna(lo) or pd.isna(hi) else (pd.Timestamp(lo), pd.Timestamp(hi))
+
+
+def _relative_range(dataset, q):
+    """(from, to) for 'last 3 months' (ending at the latest date) or 'first 2 years' (from the earliest)"""
+    m = re.search(RELATIVE_RE, q)
+    if not m:
+        return None, None
+    lo, hi = dataset.derived("date_extent", _date_extent)
+    if lo is None:
+        return None, None
+    span = RELATIVE_UNITS[m.group(3)] * int(m.group(2))
+    if m.group(1) == "first":
+        return lo, lo + span - pd.Timedelta(1, "ns")
+    return hi - span + pd.Timedelta(1, "ns"), hi
+
+
+def parse_question(dataset, question):
+    """Turn a free-text question into a normalised QueryPlan"""
+    q = question.lower()
+    tokens = re.findall(r"\w+", q)
+    words = set(tokens)
+
+    if words & GREETINGS and len(tokens) <= 3:
+        return QueryPlan("greet", None, (), None, None, None, None, None, False)
+    if "compare" in words:
+        return QueryPlan("compare", None, (), None, None, None, None, None, False)
+
+    intent = "summary" if words & {"summary", "summarise", "summarize", "overview"} else "aggregate"
+    agg = next((a for a, ws in AGG_WORDS if words & ws), None)
+
+    # Filters: any n-gram of the question that names a known category/status value
+    vocab = dataset.derived("query_vocab", _vocabulary)
+    found, used = {}, set()
+    for n in range(min(MAX_NGRAM, len(tokens)), 0, -1):
+        for i in range(len(tokens) - n + 1):
+            span = set(range(i, i + n))
+            hit = None if span & used else vocab.get(tuple(tokens[i:i + n]))
+            if hit:
+                # Longest match wins: "tata trust" is not also read as "trust"
+                used |= span
+                found.setdefault(hit[0], set()).add(hit[1])
+    filters = tuple(sorted((str(c), tuple(sorted(vs, key=str))) for c, vs in found.items()))
+
+    date_from, date_to = _date_range(q) if dataset.date else (None, None)
+    if dataset.date and date_from is None and date_to is None:
+        date_from, date_to = _relative_range(dataset, q)
+
+    # Grouping: "by donor", "per month", "each status", or an implicit top/bottom N
+    group_by, period = None, None
+    colwords = dataset.derived("query_columns", _column_words)
+    m = re.search(r"\b(?:by|per|each|every|across)\s+(\w+)", q)
+    if m:
+        w = m.group(1)
+        if w in colwords or w.rstrip("s") in colwords:
+            group_by = colwords.get(w) or colwords[w.rstrip("s")]
+        elif w in PERIODS and dataset.date:
+            group_by, period = dataset.date, PERIODS[w]
+    top = re.search(r"\b(top|bottom|first|last)\s+(\d+)\b(?!\s+(?:day|week|month|quarter|year)s?\b)", q)
+    top_n = int(top.group(2)) if top else None
+    ascending = bool(top and top.group(1) in ("bottom", "last")) or agg == "min"
+    if top_n and not group_by:
+        group_by = dataset.cat
+    if top_n and agg in (None, "max", "min"):
+        agg = "sum"
+
+    if agg is None:
+        if intent == "summary" or group_by or filters or date_from is not None or date_to is not None:
+            agg = "sum"
+        else:
+            return QueryPlan("help", None, (), None, None, None, None, None, False)
+    return QueryPlan(intent, agg, filters, date_from, date_to, group_by, period, top_n, ascending)
+
+
+def _mask(dataset, plan):
+    df, mask = dataset.df, None
+    for col, values in plan.filters:
+        m = df[col].isin(list(values))
+        mask = m if mask is None else mask & m
+    if plan.date_from is not None or plan.date_to is not None:
+        d = dataset.dates
+        m = d.notna()
+        if plan.date_from is not None:
+            m &= d >= plan.date_from
+        if plan.date_to is not None:
+            m &= d <= plan.date_to
+        mask = m if mask is None else mask & m
+    return mask
+
+
+def run_plan(dataset, plan):
+    """Execute a plan with one vectorised pandas operation (or one SQL scan for a columnar
+    dataset), memoised per (dataset hash, plan)"""
+    key = (dataset.digest or id(dataset), dataset.columnar, plan)
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+
+    result = dataset.run_plan(plan) if dataset.columnar else _run_pandas(dataset, plan)
+    with _memo_lock:
+        _memo[key] = result
+        if len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return result
+
+
+def _run_pandas(dataset, plan):
+    df, amt = dataset.df, dataset.amt
+    mask = _mask(dataset, plan)
+    values = pd.to_numeric(df[amt], errors="coerce")
+    if mask is not None:
+        values = values[mask.to_numpy()]
+    records = len(values)
+
+    if plan.group_by:
+        key_col = dataset.dates.dt.to_period(plan.period) if plan.period else df[plan.group_by]
+        if mask is not None:
+            key_col = key_col[mask.to_numpy()]
+        agg = "size" if plan.agg == "count" else plan.agg
+        grouped = values.groupby(key_col, observed=True, sort=False).agg(agg)
+        grouped = grouped.dropna()
+        if plan.period:
+            grouped = grouped.sort_index()
+            shown = grouped.tail(plan.top_n or 12)
+        else:
+            n = plan.top_n or 10
+            shown = grouped.nsmallest(n) if plan.ascending else grouped.nlargest(n)
+        result = {"kind": "groups", "groups": shown, "n_groups": len(grouped), "records": records}
+    elif plan.agg in ("max", "min") and plan.intent == "aggregate":
+        if values.notna().any():
+            pos = values.idxmax() if plan.agg == "max" else values.idxmin()
+            result = {"kind": "row", "label": df.at[pos, dataset.cat] if dataset.cat else pos,
+                      "value": values[pos], "records": records}
+        else:
+            result = {"kind": "empty", "records": records}
+    else:
+        agg = plan.agg
+        value = records if agg == "count" else getattr(values, agg)()
+        total = value if agg == "sum" else values.sum()
+        result = {"kind": "value", "value": value, "total": total, "records": records}
+    return result
+
+
+def _describe(plan):
+    parts = [f"{col} = {', '.join(map(str, vs))}" for col, vs in plan.filters]
+    if plan.date_from is not None or plan.date_to is not None:
+        lo = plan.date_from.date() if plan.date_from is not None else "start"
+        hi = plan.date_to.date() if plan.date_to is not None else "today"
+        parts.append(f"{lo} → {hi}")
+    return f"\n\n_Filters: {'; '.join(parts)}_" if parts else ""
+
+
+def _money(v):
+    return f"₹ {v:,.2f}" if pd.notna(v) else "n/a"
+
+
+AGG_LABELS = {"sum": "Total", "mean": "Average", "max": "Highest", "min": "Lowest", "count": "Records"}
+
+
+def answer(dataset, question):
+    """Markdown answer to a chat question about a tabular dataset"""
+    plan = parse_question(dataset, question)
+    if plan.intent == "greet":
+        return "Hello! I am your Magic Bus Financial Assistant."
+    if plan.intent == "compare":
+        return "You can use the 'Dashboard' tab filters to compare projects visually!"
+    if plan.intent == "help":
+        return ("I can answer: Total, Average, Max, Min, Count and Summary — filtered by project, status "
+                "or year, grouped 'by <column>' / 'per month', or 'top 5'. Try asking: 'Spend by donor in 2024'.")
+
+    res = run_plan(dataset, plan)
+    note = _describe(plan)
+    if res["records"] == 0:
+        return "No records match that question." + note
+    if plan.intent == "summary" and res["kind"] != "groups":
+        return f"**Summary:** Analyzed {res['records']} records. Total Spend: {_money(res['total'])}." + note
+    if res["kind"] == "row":
+        icon = "🏆" if plan.agg == "max" else "📉"
+        return f"{icon} **{AGG_LABELS[plan.agg]}:** {res['label']} (**{_money(res['value'])}**)" + note
+    if res["kind"] == "value":
+        if plan.agg == "count":
+            return f"🧾 **Records:** {res['value']:,}" + note
+        if plan.agg == "mean":
+            return f"📊 **Average Transaction:** {_money(res['value'])}" + note
+        return f"💰 **Total Volume:** {_money(res['value'])}" + note
+    if res["kind"] == "empty":
+        return "No amounts recorded for that selection." + note
+
+    label = plan.group_by if not plan.period else f"{plan.group_by} ({plan.period})"
+    fmt = (lambda v: f"{int(v):,}") if plan.agg == "count" else _money
+    lines = [f"- **{k}**: {fmt(v)}" for k, v in res["groups"].items()]
+    more = res["n_groups"] - len(lines)
+    tail = f"\n- _…and {more} more_" if more > 0 else ""
+    return f"📋 **{AGG_LABELS[plan.agg]} by {label}:**\n" + "\n".join(lines) + tail + note
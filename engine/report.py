@@ -0,0 +1,218 @@
+"""Headless batch reports: Dashboard KPIs, top categories and monthly trends for a folder of files.
+
+    python -m engine.report INPUT_DIR --out reports/
+    python -m engine.report INPUT_DIR --out reports/ --workers 8 --cache ~/.cache/magicbus
+
+Every CSV/XLSX/PDF in ``INPUT_DIR`` is processed in its own worker process
+(largest first). Ledgers go through the same ingest, ``auto_map_columns`` and
+aggregate cube as the Dashboard; PDFs get page and text statistics. For each
+input ``<name>`` the output folder gets ``<name>.json`` and, for ledgers,
+``<name>.top10.svg`` and ``<name>.monthly.svg``; ``summary.json`` indexes all
+of them and ``summary.csv`` has one KPI row per ledger. Results are cached on
+disk by the SHA-256 of the input bytes, so unchanged files are not parsed
+again on the next run. The exit status is 1 if any input failed.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+from engine import svg
+from engine.cache import file_digest
+from engine.charts import trend
+from engine.ingest import load_table
+from engine.pool import cpu_count, mp_context
+
+EXTENSIONS = (".csv", ".xlsx", ".pdf")
+TOP_N = 10
+PDF_HEAD_CHARS = 600
+# Bump when the summary layout or the aggregation changes, so old cache entries are ignored
+CACHE_VERSION = 1
+
+
+def _num(value):
+    """JSON-safe number (NaN/inf -> None)"""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def table_summary(name, data, digest):
+    """(summary, charts) for one ledger, computed exactly like the Dashboard"""
+    ds = load_table(name, data, digest)
+    amt, cat, date, status = ds.mapping
+    summary = {"kind": "table", "rows": len(ds),
+               "mapping": {"amount": amt, "category": cat, "date": date, "status": status},
+               "kpis": None, "top_categories": [], "monthly": []}
+    charts = {}
+    cube = ds.cube
+    if cube is None:
+        return summary, charts
+    kpi = cube.kpis()
+    summary["kpis"] = {"total_spend": _num(kpi["total"]), "avg_transaction": _num(kpi["mean"]),
+                       "max_project": _num(kpi["max"]), "records": int(kpi["records"])}
+    top = cube.top(None, TOP_N).iloc[::-1]
+    summary["top_categories"] = [{"category": str(c), "amount": _num(v)} for c, v in zip(top[cat], top[amt])]
+    charts["top10"] = svg.bar_chart(top[cat].tolist(), top[amt].to_numpy(), f"Top {TOP_N} by {amt} · {name}")
+    monthly = trend(cube, None, "Month")
+    if monthly is not None and not monthly.empty:
+        months = monthly[date].dt.strftime("%Y-%m").tolist()
+        summary["monthly"] = [{"month": m, "amount": _num(v)} for m, v in zip(months, monthly[amt])]
+        charts["monthly"] = svg.line_chart(months, monthly[amt].to_numpy(), f"Monthly {amt} · {name}")
+    return summary, charts
+
+
+def pdf_summary(name, data, digest):
+    """(summary, charts) for one PDF: page and text statistics plus the opening text"""
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        pages = [page.extract_text() or "" for page in pdf.pages]
+    text = "\n".join(pages)
+    return {"kind": "pdf", "pages": len(pages), "empty_pages": sum(not p.strip() for p in pages),
+            "characters": len(text), "words": len(text.split()), "head": text[:PDF_HEAD_CHARS]}, {}
+
+
+def _cache_path(cache_dir, digest):
+    return os.path.join(cache_dir, f"{digest}.json")
+
+
+def _cached(cache_dir, digest):
+    """(summary, charts) stored for ``digest`` by this version, or None"""
+    if not cache_dir:
+        return None
+    try:
+        with open(_cache_path(cache_dir, digest), encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("version") != CACHE_VERSION:
+        return None
+    return entry["summary"], entry["charts"]
+
+
+def _write(path, text):
+    """Write atomically, so a crashed or parallel run never leaves half a file"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def summarize(path, out_dir, cache_dir=None):
+    """Worker: summarise one input into ``out_dir``; returns its summary (status 'failed' on error)"""
+    t0 = time.perf_counter()
+    name = os.path.basename(path)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = file_digest(data)
+        hit = _cached(cache_dir, digest)
+        if hit is None:
+            build = pdf_summary if name.lower().endswith(".pdf") else table_summary
+            summary, charts = build(name, data, digest)
+            if cache_dir:
+                _write(_cache_path(cache_dir, digest),
+                       json.dumps({"version": CACHE_VERSION, "summary": summary, "charts": charts}))
+        else:
+            summary, charts = hit
+        files = {}
+        for key, text in charts.items():
+            files[key] = f"{name}.{key}.svg"
+            _write(os.path.join(out_dir, files[key]), text)
+        result = {"file": name, "status": "ok", "digest": digest, "bytes": len(data), **summary,
+                  "charts": files, "cached": hit is not None, "seconds": round(time.perf_counter() - t0, 3)}
+    except Exception as e:
+        return {"file": name, "status": "failed", "error": f"{type(e).__name__}: {e}",
+                "seconds": round(time.perf_counter() - t0, 3)}
+    _write(os.path.join(out_dir, f"{name}.json"), json.dumps(result, indent=2, ensure_ascii=False))
+    return result
+
+
+def find_inputs(in_dir):
+    """CSV/XLSX/PDF files directly inside ``in_dir``, largest first (the slowest start earliest)"""
+    paths = [os.path.join(in_dir, n) for n in os.listdir(in_dir)
+             if n.lower().endswith(EXTENSIONS) and not n.startswith(("~$", "."))]
+    return sorted((p for p in paths if os.path.isfile(p)), key=os.path.getsize, reverse=True)
+
+
+def run(inputs, out_dir, workers=None, cache_dir=None, log=print):
+    """Summaries of every input, processed by ``workers`` processes (inline when 1)"""
+    os.makedirs(out_dir, exist_ok=True)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    workers = max(1, min(workers or cpu_count(), len(inputs) or 1))
+    results = []
+    if workers == 1:
+        for path in inputs:
+            results.append(summarize(path, out_dir, cache_dir))
+            log(_line(results[-1]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context()) as pool:
+            futures = [pool.submit(summarize, path, out_dir, cache_dir) for path in inputs]
+            for future in as_completed(futures):
+                results.append(future.result())
+                log(_line(results[-1]))
+    results.sort(key=lambda r: r["file"])
+    write_index(results, out_dir)
+    return results
+
+
+def _line(r):
+    if r["status"] != "ok":
+        return f"✗ {r['file']:<40} {r['error']}"
+    size = f"{r['rows']:,} rows" if r["kind"] == "table" else f"{r['pages']:,} pages"
+    return f"✓ {r['file']:<40} {size:>14} {r['seconds']:>8.2f}s{' (cached)' if r['cached'] else ''}"
+
+
+def write_index(results, out_dir):
+    """summary.json (every input) and summary.csv (one KPI row per ledger)"""
+    index = {"generated": datetime.now().isoformat(timespec="seconds"), "inputs": len(results),
+             "failed": sum(r["status"] != "ok" for r in results), "files": results}
+    _write(os.path.join(out_dir, "summary.json"), json.dumps(index, indent=2, ensure_ascii=False))
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["file", "rows", "total_spend", "avg_transaction", "max_project", "records",
+                     "amount_column", "category_column", "top_category"])
+    for r in results:
+        if r["status"] != "ok" or r["kind"] != "table":
+            continue
+        k = r["kpis"] or {}
+        top = r["top_categories"][0]["category"] if r["top_categories"] else ""
+        writer.writerow([r["file"], r["rows"], k.get("total_spend"), k.get("avg_transaction"), k.get("max_project"),
+                         k.get("records"), r["mapping"]["amount"], r["mapping"]["category"], top])
+    _write(os.path.join(out_dir, "summary.csv"), buf.getvalue())
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("input_dir", help="folder of CSV/XLSX/PDF files")
+    ap.add_argument("--out", required=True, help="folder for the JSON summaries and SVG charts")
+    ap.add_argument("--workers", type=int, default=cpu_count(), help="worker processes (default: all cores)")
+    ap.add_argument("--cache", help="parse cache folder (default: <out>/.cache)")
+    ap.add_argument("--no-cache", action="store_true", help="parse every input again")
+    args = ap.parse_args(argv)
+
+    if not os.path.isdir(args.input_dir):
+        ap.error(f"not a folder: {args.input_dir}")
+    inputs = find_inputs(args.input_dir)
+    if not inputs:
+        print(f"No CSV/XLSX/PDF files in {args.input_dir}")
+        return 0
+    cache_dir = None if args.no_cache else (args.cache or os.path.join(args.out, ".cache"))
+    t0 = time.perf_counter()
+    results = run(inputs, args.out, args.workers, cache_dir)
+    failed = sum(r["status"] != "ok" for r in results)
+    cached = sum(r.get("cached", False) for r in results)
+    print(f"{len(results)} file(s) in {time.perf_counter() - t0:.1f}s · {cached} from cache · {failed} failed "
+          f"→ {os.path.join(args.out, 'summary.json')}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
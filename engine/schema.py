@@ -0,0 +1,225 @@
+"""Column auto-mapping: which columns hold the Amount, Category, Date and Status.
+
+``infer_schema`` profiles a bounded, evenly spaced sample of rows once and
+scores every column as a candidate for each role from its name and its
+content (numeric/currency parse rate, date parse rate, cardinality, status
+vocabulary). Names win over content: a column named like an amount, project
+or status beats any column that only looks like one, so files the original
+keyword rules mapped well still map the same way. Indian-formatted amounts
+such as "₹1,23,456.00", "Rs. 5,000/-" or "(5,000)" are recognised, and
+``parse_currency`` converts such columns with vectorised string operations.
+Profiles are memoised by a fingerprint of the sample, so re-mapping the same
+data is free.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from engine.charts import parse_dates
+
+SAMPLE_ROWS = 2000
+# The original keyword rules; a name with one of these outranks the extra words below
+AMOUNT_WORDS = ('spend', 'amount', 'cost', 'total', 'budget')
+MORE_AMOUNT_WORDS = ('expense', 'expenditure', 'value', 'payment', 'paid', 'grant', 'disbursed', 'inr', 'price')
+CATEGORY_WORDS = ('project', 'donor', 'name', 'activity')
+MORE_CATEGORY_WORDS = ('program', 'category', 'scheme', 'vendor', 'partner', 'centre', 'center', 'head')
+DATE_WORDS = ('date', 'time', 'year', 'month', 'period')
+ID_TOKENS = {'id', 'no', 'num', 'number', 'code', 'ref', 'sr', 'serial', 'pin', 'zip', 'phone', 'mobile', 'txn'}
+STATUS_VALUES = {'paid', 'pending', 'approved', 'rejected', 'completed', 'complete', 'open', 'closed', 'cleared',
+                 'disbursed', 'in progress', 'on hold', 'cancelled', 'canceled', 'draft', 'submitted', 'overdue',
+                 'active', 'inactive', 'failed', 'success', 'processing', 'unpaid', 'partially paid'}
+
+_CURRENCY_RE = r"(?i)₹|rs\.?|inr|\$|€|£|,|/-|\s"
+# Formatting that only amounts carry: symbols/codes, digit grouping, '/-', accounting brackets, Dr/Cr
+_MARKER_RE = r"(?i)₹|\brs\b|\binr\b|\$|€|£|\d,\d|/-$|^\(.*\)$|\d\s*(?:dr|cr)\.?$"
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+MEMO_SIZE = 256
+
+
+def parse_currency(s):
+    """Vectorised conversion of currency text to float.
+
+    Handles currency symbols/codes, Indian digit grouping, a trailing '/-',
+    accounting negatives '(5,000)', trailing minus and 'Dr'/'Cr' suffixes.
+    Unparseable values become NaN. Category columns convert only their categories.
+    """
+    if pd.api.types.is_numeric_dtype(s) and not isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        cats = parse_currency(pd.Series(s.cat.categories.astype(str)))
+        lookup = np.append(cats.to_numpy(dtype="float64"), np.nan)
+        return pd.Series(lookup[s.cat.codes.to_numpy()], index=s.index, name=s.name)
+    text = s.astype("string").str.strip()
+    neg = (text.str.startswith("(") & text.str.endswith(")")) | text.str.endswith("-") & ~text.str.endswith("/-")
+    neg |= text.str.contains(r"(?i)\bdr\.?$", regex=True)
+    cleaned = text.str.replace(r"(?i)\s*(dr|cr)\.?$", "", regex=True)
+    cleaned = cleaned.str.replace(_CURRENCY_RE, "", regex=True).str.strip("()").str.rstrip("-")
+    values = pd.to_numeric(cleaned, errors="coerce").astype("float64")
+    values = values.where(~neg.fillna(False).astype(bool), -values.abs())
+    return pd.Series(values.to_numpy(dtype="float64", na_value=np.nan), index=s.index, name=s.name)
+
+
+class ColumnProfile:
+    """What the sample says about one column"""
+
+    def __init__(self, name, kind, numeric_rate=0.0, date_rate=0.0, unique_ratio=0.0, status_rate=0.0, id_like=False,
+                 marked=False):
+        self.name = name
+        self.kind = kind              # 'numeric', 'currency', 'datetime', 'text' or 'other'
+        self.numeric_rate = numeric_rate
+        self.marked = marked          # currency text with symbols, grouping or Dr/Cr, not just digits
+        self.date_rate = date_rate
+        self.unique_ratio = unique_ratio
+        self.status_rate = status_rate
+        self.id_like = id_like
+
+    def __repr__(self):
+        return (f"ColumnProfile({self.name!r}, {self.kind}, num={self.numeric_rate:.2f}, "
+                f"date={self.date_rate:.2f}, uniq={self.unique_ratio:.2f}, status={self.status_rate:.2f})")
+
+
+class Schema:
+    """Detected column roles plus the per-column profile they were scored from"""
+
+    def __init__(self, mapping, profiles):
+        self.mapping = mapping
+        self.amt, self.cat, self.date, self.status = mapping
+        self.profiles = profiles
+
+    @property
+    def currency_columns(self):
+        """Text columns to convert at ingest: the amount, and columns formatted as money.
+
+        Digit-only text (cheque numbers, codes) stays text; ingest also keeps
+        the text of any column but the amount when a value does not parse.
+        """
+        return [c for c, p in self.profiles.items() if p.kind == "currency" and (c == self.amt or p.marked)]
+
+
+def _sample(df):
+    if len(df) <= SAMPLE_ROWS:
+        return df
+    return df.iloc[np.linspace(0, len(df) - 1, SAMPLE_ROWS).astype(int)]
+
+
+def _fingerprint(sample):
+    return (tuple(map(str, sample.columns)), tuple(map(str, sample.dtypes)),
+            int(pd.util.hash_pandas_object(sample.astype(str), index=False).sum()))
+
+
+def _tokens(name):
+    return set(re.findall(r"[a-z]+", re.sub(r"([a-z])([A-Z])", r"\1 \2", str(name)).lower()))
+
+
+def _has(name, words):
+    low = str(name).lower()
+    return any(w in low for w in words)
+
+
+def _tier(name, words, more_words):
+    """2 for one of the original keywords, 1 for an extra one, else 0"""
+    return 2 if _has(name, words) else 1 if _has(name, more_words) else 0
+
+
+def _amount_score(c, p):
+    # Any amount word outranks every unnamed numeric column (which scores at most 1);
+    # ids lose within their tier, and only unnamed date-like columns ('Year') are ruled out
+    tier = _tier(c, AMOUNT_WORDS, MORE_AMOUNT_WORDS)
+    if tier:
+        return 4 * tier + (p.numeric_rate >= 0.9) - 2 * p.id_like
+    return (p.numeric_rate >= 0.9) - 3 * p.id_like - 3 * _has(c, DATE_WORDS)
+
+
+def _category_score(c, p):
+    # Named columns by tier (ids last within it), then the first ordinary text column as
+    # the original rules did; all-unique or id text (voucher numbers, narrations) comes last
+    tier = _tier(c, CATEGORY_WORDS, MORE_CATEGORY_WORDS)
+    if tier:
+        return 2 + 2 * tier - p.id_like
+    if p.kind != "text":
+        return 0
+    return 0.5 if p.id_like or p.unique_ratio >= 0.95 else 1
+
+
+def profile_column(name, s):
+    values = s.dropna()
+    n = len(values)
+    if n == 0:
+        return ColumnProfile(name, "other")
+    unique_ratio = values.nunique() / n
+    id_like = bool(_tokens(name) & ID_TOKENS)
+    if pd.api.types.is_bool_dtype(s):
+        return ColumnProfile(name, "other", unique_ratio=unique_ratio)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return ColumnProfile(name, "datetime", date_rate=1.0, unique_ratio=unique_ratio)
+    if pd.api.types.is_numeric_dtype(s) and not isinstance(s.dtype, pd.CategoricalDtype):
+        # Sequential unique integers are row ids, not amounts
+        if not id_like and unique_ratio == 1.0 and n > 10 and (values == values.round()).all() \
+                and values.is_monotonic_increasing:
+            id_like = True
+        return ColumnProfile(name, "numeric", numeric_rate=1.0, unique_ratio=unique_ratio, id_like=id_like)
+
+    text = values.astype(str).str.strip()
+    numeric_rate = parse_currency(text).notna().mean()
+    date_rate = 0.0
+    if numeric_rate < 0.5:
+        date_rate = parse_dates(text).notna().mean()
+    status_rate = text.str.lower().isin(STATUS_VALUES).mean()
+    kind = "currency" if numeric_rate >= 0.9 else "text"
+    marked = kind == "currency" and bool(text.str.contains(_MARKER_RE, regex=True).any())
+    return ColumnProfile(name, kind, numeric_rate, date_rate, unique_ratio, status_rate, id_like, marked)
+
+
+def _pick(scores):
+    """Highest-scoring column (earliest on ties), or None when nothing scored"""
+    best = None
+    for c, score in scores:
+        if score > 0 and (best is None or score > best[1]):
+            best = (c, score)
+    return best[0] if best else None
+
+
+def infer_schema(df):
+    """Score every column of a bounded sample for the Amount/Category/Date/Status roles"""
+    sample = _sample(df)
+    key = _fingerprint(sample)
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+
+    cols = list(df.columns)
+    profiles = {c: profile_column(c, sample[c]) for c in cols}
+
+    # 1. Amount: numeric (or currency text) content, an amount-like name first
+    amt = _pick((c, _amount_score(c, p)) for c, p in profiles.items() if p.kind in ("numeric", "currency"))
+
+    # 2. Date: parseable dates, or a date-like name
+    date = _pick((c, 3 * _has(c, DATE_WORDS) + p.date_rate * (p.date_rate >= 0.8))
+                 for c, p in profiles.items() if c != amt and (p.kind in ("datetime", "text") or _has(c, DATE_WORDS)))
+
+    # 3. Status: a 'status' name or values from the status vocabulary
+    status = _pick((c, 3 * ('status' in str(c).lower()) + p.status_rate * (p.status_rate >= 0.6))
+                   for c, p in profiles.items() if c not in (amt, date))
+
+    # 4. Category: the first project/donor-like name, else the first ordinary text column
+    cat = _pick((c, _category_score(c, p)) for c, p in profiles.items()
+                if c not in (amt, date, status) and (p.kind == "text" or _has(c, CATEGORY_WORDS + MORE_CATEGORY_WORDS)))
+    if not cat and len(cols) > 0:
+        cat = next((c for c in cols if c not in (amt, date, status)), cols[0])
+
+    schema = Schema((amt, cat, date, status), profiles)
+    with _memo_lock:
+        _memo[key] = schema
+        if len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return schema
+
+
+def auto_map_columns(df):
+    """Smartly detects Amount, Category, Date and Status columns"""
+    return infer_schema(df).mapping
@@ -0,0 +1,147 @@
+"""Token-level inverted index with BM25 ranking for PDF questions.
+
+Each non-empty line of a page is one passage. Postings map a token to the
+passages containing it (with term frequency), so a query only touches the
+postings of its own terms and latency stays flat as documents grow. Several
+indexes (one per loaded PDF) can be searched together with shared corpus
+statistics.
+"""
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset("""
+    a an and are as at be by can did do does for from had has have how i in is it its me
+    of on or our show tell that the their there this to was we were what when where which
+    who why will with you your find give list please about
+""".split())
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def query_terms(query):
+    """Distinct query tokens minus stopwords (all tokens if the query is only stopwords)"""
+    tokens = tokenize(query)
+    terms = [t for t in dict.fromkeys(tokens) if t not in STOPWORDS]
+    return terms or list(dict.fromkeys(tokens))
+
+
+class PassageIndex:
+    """Inverted index over the lines of one document, filled page by page"""
+
+    def __init__(self, name=None):
+        self.name = name
+        self.pages = array("I")      # page number of each passage (0-based)
+        self.lines = array("I")      # line number within the page (0-based)
+        self.lengths = array("I")    # token count of each passage
+        self.texts = []
+        self.total_len = 0
+        self._nbytes = 0
+        self._pids = {}
+        self._tfs = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add_page(self, page_no, text):
+        """Index every non-empty line of a page (pages may arrive in any order); returns the bytes added"""
+        with self._lock:
+            before = self._nbytes
+            for line_no, line in enumerate(text.split("\n")):
+                tokens = tokenize(line)
+                if not tokens:
+                    continue
+                pid = len(self.texts)
+                self.texts.append(line.strip())
+                self.pages.append(page_no)
+                self.lines.append(line_no)
+                self.lengths.append(len(tokens))
+                self.total_len += len(tokens)
+                counts = Counter(tokens)
+                for tok, tf in counts.items():
+                    if tok not in self._pids:
+                        self._pids[tok] = array("I")
+                        self._tfs[tok] = array("H")
+                    self._pids[tok].append(pid)
+                    self._tfs[tok].append(min(tf, 65535))
+                # Page/line/length entries, the passage text and a 4+2 byte posting per distinct token
+                self._nbytes += 12 + len(self.texts[-1]) + 6 * len(counts)
+            return self._nbytes - before
+
+    def postings(self, term):
+        pids = self._pids.get(term)
+        if pids is None:
+            return None, None
+        return np.frombuffer(pids, dtype=np.uint32).copy(), np.frombuffer(self._tfs[term], dtype=np.uint16).astype(np.float64)
+
+    def search(self, query, k=3):
+        return search([self], query, k)
+
+    @property
+    def nbytes(self):
+        """Size of the arrays, passage texts and postings, kept up to date by ``add_page``"""
+        return self._nbytes
+
+
+class Hit:
+    """One ranked passage with its page/line reference (1-based for display)"""
+
+    def __init__(self, score, index, pid):
+        self.score = score
+        self.doc = index.name
+        self.page = index.pages[pid] + 1
+        self.line = index.lines[pid] + 1
+        self.text = index.texts[pid]
+
+    def __repr__(self):
+        return f"Hit({self.score:.2f}, {self.doc!r}, p.{self.page} l.{self.line}, {self.text[:40]!r})"
+
+
+def search(indexes, query, k=3):
+    """BM25 top-k passages across one or more indexes, best first"""
+    terms = query_terms(query)
+    if not terms or not indexes:
+        return []
+    # Fixed lock order so concurrent searches over overlapping sets cannot deadlock
+    locked = sorted(set(indexes), key=id)
+    for ix in locked:
+        ix._lock.acquire()
+    try:
+        n_docs = sum(len(ix) for ix in indexes)
+        if n_docs == 0:
+            return []
+        avgdl = sum(ix.total_len for ix in indexes) / n_docs
+        df = {t: sum(len(ix._pids.get(t, ())) for ix in indexes) for t in terms}
+        idf = {t: math.log(1 + (n_docs - d + 0.5) / (d + 0.5)) for t, d in df.items() if d}
+        best = []
+        for ix in indexes:
+            ids, contrib = [], []
+            for t, w in idf.items():
+                pids, tfs = ix.postings(t)
+                if pids is None:
+                    continue
+                # Index the buffer view straight away: a live view would block appends
+                norm = K1 * (1 - B + B * np.frombuffer(ix.lengths, dtype=np.uint32)[pids] / avgdl)
+                ids.append(pids)
+                contrib.append(w * tfs * (K1 + 1) / (tfs + norm))
+            if not ids:
+                continue
+            uniq, inv = np.unique(np.concatenate(ids), return_inverse=True)
+            scores = np.bincount(inv, weights=np.concatenate(contrib))
+            top = np.argsort(-scores, kind="stable")[:k]
+            best += [Hit(float(scores[i]), ix, int(uniq[i])) for i in top]
+        best.sort(key=lambda h: -h.score)
+        return best[:k]
+    finally:
+        for ix in locked:
+            ix._lock.release()
@@ -0,0 +1,82 @@
+"""Static SVG charts for headless reports (no browser or image renderer needed).
+
+Colours follow the Dashboard: red bars for the top categories and a red
+line for the trend.
+"""
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+WIDTH = 760
+FONT = "font-family='Inter, Helvetica, Arial, sans-serif'"
+BAR_COLOR = "#b71c1c"
+LINE_COLOR = "#D32F2F"
+GRID_COLOR = "#e0e0e0"
+
+
+def _short(value):
+    """12345678 -> '12.3M'"""
+    if value is None or not np.isfinite(value):
+        return ""
+    for limit, suffix in ((1e9, "B"), (1e6, "M"), (1e3, "k")):
+        if abs(value) >= limit:
+            return f"{value / limit:.1f}{suffix}"
+    return f"{value:,.0f}"
+
+
+def _svg(height, title, body):
+    return (f"<svg xmlns='http://www.w3.org/2000/svg' width='{WIDTH}' height='{height}' "
+            f"viewBox='0 0 {WIDTH} {height}' {FONT}>"
+            f"<rect width='100%' height='100%' fill='white'/>"
+            f"<text x='16' y='26' font-size='16' font-weight='600' fill='#212121'>{escape(title)}</text>"
+            f"{body}</svg>\n")
+
+
+def bar_chart(labels, values, title):
+    """Horizontal bars, first label on top"""
+    label_w, row_h, top = 260, 26, 44
+    height = top + row_h * max(1, len(labels)) + 16
+    vmax = max([v for v in values if np.isfinite(v)] + [0.0]) or 1.0
+    span = WIDTH - label_w - 90
+    parts = []
+    for i, (label, value) in enumerate(zip(labels, values)):
+        y = top + i * row_h
+        w = max(0.0, value) / vmax * span if np.isfinite(value) else 0.0
+        text = str(label) if len(str(label)) <= 36 else str(label)[:35] + "…"
+        parts.append(f"<text x='{label_w - 8}' y='{y + 17}' font-size='12' text-anchor='end' fill='#424242'>"
+                     f"{escape(text)}</text>"
+                     f"<rect x='{label_w}' y='{y + 4}' width='{w:.1f}' height='{row_h - 8}' fill='{BAR_COLOR}' rx='2'/>"
+                     f"<text x='{label_w + w + 6:.1f}' y='{y + 17}' font-size='11' fill='#616161'>{_short(value)}</text>")
+    return _svg(height, title, "".join(parts))
+
+
+def line_chart(labels, values, title, height=320):
+    """Line over evenly spaced x labels (at most ~12 tick labels are drawn)"""
+    left, right, top, bottom = 70, 20, 44, 40
+    w, h = WIDTH - left - right, height - top - bottom
+    values = np.asarray(values, dtype="float64")
+    finite = values[np.isfinite(values)]
+    lo, hi = (min(0.0, finite.min()), finite.max()) if len(finite) else (0.0, 1.0)
+    hi = hi if hi > lo else lo + 1.0
+    n = len(values)
+    xs = [left + (w * i / (n - 1) if n > 1 else w / 2) for i in range(n)]
+    ys = [top + h - (v - lo) / (hi - lo) * h if np.isfinite(v) else None for v in values]
+    parts = []
+    for k in range(5):
+        v = lo + (hi - lo) * k / 4
+        y = top + h - h * k / 4
+        parts.append(f"<line x1='{left}' y1='{y:.1f}' x2='{left + w}' y2='{y:.1f}' stroke='{GRID_COLOR}'/>"
+                     f"<text x='{left - 6}' y='{y + 4:.1f}' font-size='11' text-anchor='end' fill='#616161'>"
+                     f"{_short(v)}</text>")
+    step = max(1, -(-n // 12))
+    for i in range(0, n, step):
+        parts.append(f"<text x='{xs[i]:.1f}' y='{top + h + 18}' font-size='11' text-anchor='middle' "
+                     f"fill='#616161'>{escape(str(labels[i]))}</text>")
+    points = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs, ys) if y is not None)
+    if points:
+        parts.append(f"<polyline points='{points}' fill='none' stroke='{LINE_COLOR}' stroke-width='3' "
+                     f"stroke-linejoin='round'/>")
+        if n <= 60:
+            parts += [f"<circle cx='{x:.1f}' cy='{y:.1f}' r='3' fill='{LINE_COLOR}'/>"
+                      for x, y in zip(xs, ys) if y is not None]
+    return _svg(height, title, "".join(parts))
@@ -0,0 +1,135 @@
+"""Per-rerun stage timings: where the time of each Streamlit rerun goes.
+
+A rerun opens a ``Run`` with ``TIMINGS.start_run()``; code anywhere on that
+thread (app or engine) wraps its work in ``with stage("name"):`` and the
+durations are summed per stage. ``finish_run`` stores one sample per stage
+per rerun, keeps the last ``WINDOW`` samples of each stage for p50/p95, and
+appends the rerun to a bounded log that exports as JSON lines. Stages may
+nest (``mapping`` runs inside ``ingest``), so they do not add up to the total.
+Fragment bodies are timed with ``TIMINGS.fragment(name)``: as the stage
+``fragment:<name>`` inside a full rerun, and as a run of their own (total
+``fragment:<name>`` instead of ``rerun``) when the fragment reruns alone.
+The first rerun of a session is also recorded as a start: ``start:cold`` for
+the first one in this server process (it pays for importing the app's
+modules), ``start:warm`` afterwards. Work done in pool processes is not
+recorded.
+"""
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+WINDOW = 500
+LOG_SIZE = 10_000
+# Display order in the admin panel; unknown stages follow alphabetically
+STAGES = ("rerun", "start:cold", "start:warm", "ingest", "mapping", "filtering", "aggregation", "chart", "answer")
+
+_local = threading.local()
+
+
+class Run:
+    """Stage durations of one rerun, summed by stage name"""
+
+    def __init__(self, run_id, start=None):
+        self.id = run_id
+        self.start = start
+        self.t0 = time.perf_counter()
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block into the current thread's rerun (a no-op outside one)"""
+    run = getattr(_local, "run", None)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if run is not None:
+            run.add(name, time.perf_counter() - t0)
+
+
+class Timings:
+    """Rolling per-stage samples and a rerun log, shared by every session"""
+
+    def __init__(self, window=WINDOW, log_size=LOG_SIZE):
+        self.window = window
+        self._samples = {}
+        self._log = deque(maxlen=log_size)
+        self._runs = 0
+        self._cold = True
+        self._lock = threading.Lock()
+
+    def start_run(self, session_start=False):
+        """Begin timing a rerun on this thread (replaces one that never finished); ``session_start``
+        marks the first rerun of a session, recorded as start:cold / start:warm"""
+        with self._lock:
+            self._runs += 1
+            start = None
+            if session_start:
+                start, self._cold = ("start:cold" if self._cold else "start:warm"), False
+            run = Run(self._runs, start)
+        _local.run = run
+        return run
+
+    def finish_run(self, total="rerun", **meta):
+        """Close the current thread's rerun and record its stages; ``meta`` goes into the log line"""
+        run = getattr(_local, "run", None)
+        if run is None:
+            return None
+        _local.run = None
+        run.add(total, time.perf_counter() - run.t0)
+        if run.start:
+            run.add(run.start, run.stages[total])
+        entry = {"ts": round(time.time(), 3), "run": run.id, **meta,
+                 "ms": {k: round(v * 1000, 3) for k, v in run.stages.items()}}
+        with self._lock:
+            for name, seconds in run.stages.items():
+                self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+            self._log.append(entry)
+        return entry
+
+    @contextmanager
+    def fragment(self, name):
+        """Time a fragment body: a stage of the full rerun, or its own run when only the fragment reruns"""
+        label = f"fragment:{name}"
+        if getattr(_local, "run", None) is not None:
+            with stage(label):
+                yield
+            return
+        self.start_run()
+        try:
+            yield
+        finally:
+            self.finish_run(total=label, fragment=name)
+
+    def summary(self):
+        """One row per stage: samples, p50/p95/max and last duration in ms"""
+        import numpy as np
+        with self._lock:
+            samples = {k: np.array(v) * 1000 for k, v in self._samples.items()}
+        order = sorted(samples, key=lambda k: (STAGES.index(k) if k in STAGES else len(STAGES), k))
+        return [{"stage": k, "reruns": len(samples[k]), "p50_ms": float(np.percentile(samples[k], 50)),
+                 "p95_ms": float(np.percentile(samples[k], 95)), "max_ms": float(samples[k].max()),
+                 "last_ms": float(samples[k][-1])} for k in order]
+
+    def jsonl(self):
+        """The rerun log as JSON lines, oldest first"""
+        with self._lock:
+            entries = list(self._log)
+        return "".join(json.dumps(e, default=str, ensure_ascii=False) + "\n" for e in entries)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._log.clear()
+
+    def __len__(self):
+        return len(self._log)
+
+
+TIMINGS = Timings()
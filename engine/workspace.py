@@ -0,0 +1,152 @@
+"""Concurrent multi-file, multi-sheet workspace ingestion.
+
+Every CSV and every Excel sheet is parsed as its own job on the shared
+process pool, so total ingest time is bounded by the slowest sheet rather
+than the sum. Each part is mapped with ``auto_map_columns`` on its own; the
+mapped Amount/Category/Date/Status columns are then renamed to the names of
+the largest part, the remaining columns are unioned, and everything is
+concatenated into one dataset with a ``Source File`` column.
+"""
+import hashlib
+import io
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from engine.dataset import Dataset
+from engine.ingest import IngestReport, concat_chunks, read_table
+from engine.jobs import Cancelled, Progress
+from engine.pool import cpu_count, process_pool
+from engine.schema import auto_map_columns
+
+SOURCE_COL = "Source File"
+
+
+def workspace_digest(digests):
+    """Order-independent hash of the member files' hashes"""
+    return hashlib.sha256(("workspace:" + ",".join(sorted(digests))).encode()).hexdigest()
+
+
+def sheet_names(name, data):
+    """Sheets to load from one file ([None] for a CSV)"""
+    if name.lower().endswith(".csv"):
+        return [None]
+    from openpyxl import load_workbook
+    wb = load_workbook(io.BytesIO(data), read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def parse_part(name, data, sheet):
+    """Worker: parse one CSV or one Excel sheet and map its columns"""
+    return read_table(name, data, auto_map_columns, sheet_name=0 if sheet is None else sheet)
+
+
+def align(parts):
+    """Rename each part's mapped columns to the reference names and concatenate.
+
+    ``parts`` is a list of ``(label, df, mapping)``; the reference mapping is
+    taken from the part with the most rows. Returns ``(df, mapping)``.
+    """
+    ref = max(parts, key=lambda p: len(p[1]))[2]
+    columns, frames, cat_cols = [], [], set()
+    for label, df, mapping in parts:
+        rename = {}
+        for mine, theirs in zip(mapping, ref):
+            # Skip a rename that would collide with a column the part already has
+            if mine and theirs and mine != theirs and theirs not in df.columns:
+                rename[mine] = theirs
+        df = df.rename(columns=rename)
+        columns += [c for c in df.columns if c not in columns]
+        cat_cols |= {c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)}
+        frames.append((label, df))
+
+    cat_cols.discard(SOURCE_COL)
+    chunks = []
+    for label, df in frames:
+        df = df.reindex(columns=columns)
+        df = df.astype({c: "category" for c in cat_cols if not isinstance(df[c].dtype, pd.CategoricalDtype)})
+        df[SOURCE_COL] = pd.Categorical.from_codes([0] * len(df), categories=[label])
+        chunks.append(df)
+
+    for c in sorted(cat_cols, key=columns.index):
+        # Categories can only be unioned when their value types agree (e.g. the same
+        # date column read as text from a CSV but as datetime from Excel does not)
+        kinds = {ch[c].cat.categories.dtype for ch in chunks if len(ch[c].cat.categories)}
+        if len(kinds) == 1:
+            kind = kinds.pop()
+            for ch in chunks:
+                if not len(ch[c].cat.categories):
+                    ch[c] = ch[c].cat.set_categories(pd.Index([], dtype=kind))
+        else:
+            cat_cols.discard(c)
+            for ch in chunks:
+                ch[c] = ch[c].astype(object)
+    return concat_chunks(chunks, sorted(cat_cols, key=columns.index) + [SOURCE_COL]), ref
+
+
+def _await_parts(jobs, futures, progress):
+    """Wait for every part, reporting finished bytes/rows and cancelling the rest on request"""
+    sizes = {}
+    for name, data, _ in jobs:
+        sizes[name] = sizes.get(name, 0) + 1
+    pending = set(futures)
+    while pending:
+        try:
+            progress.check()
+        except Cancelled:
+            for fut in futures:
+                fut.cancel()
+            raise
+        _, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+        finished = [(job, fut) for job, fut in zip(jobs, futures) if fut.done() and not fut.exception()]
+        progress.update(bytes_done=sum(len(data) // sizes[name] for (name, data, _), _ in finished),
+                        rows=sum(len(fut.result()[0]) for _, fut in finished))
+
+
+def load_workspace(files, digest=None, progress=None):
+    """Parse ``[(name, bytes), ...]`` (CSV/XLSX, all sheets) concurrently into one Dataset"""
+    t0 = time.perf_counter()
+    progress = progress or Progress()
+    progress.update(phase="Listing sheets", bytes_total=sum(len(data) for _, data in files))
+    jobs = [(name, data, sheet) for name, data in files for sheet in sheet_names(name, data)]
+    use_processes = len(jobs) > 1 and cpu_count() > 1
+    pool = process_pool() if use_processes else ThreadPoolExecutor(max_workers=1)
+    futures = [pool.submit(parse_part, *job) for job in jobs]
+    progress.update(phase=f"Parsing {len(jobs)} sheet{'s' if len(jobs) != 1 else ''}")
+    try:
+        _await_parts(jobs, futures, progress)
+    finally:
+        if not use_processes:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    parts, sources, skipped, peak = [], [], [], 0
+    for (name, _, sheet), fut in zip(jobs, futures):
+        label = name if sheet is None else f"{name} › {sheet}"
+        df, mapping, report = fut.result()
+        peak += report.peak_bytes
+        # Sheets with no rows or no amount column (notes, lookups) are left out
+        if df.empty or not mapping[0]:
+            skipped.append(label)
+            continue
+        parts.append((label, df, mapping))
+        sources.append((label, len(df), report.seconds))
+    if not parts:
+        raise ValueError("No sheet with an amount column was found in the workspace.")
+
+    progress.update(phase="Aligning columns")
+    held = sum(int(df.memory_usage(deep=True).sum()) for _, df, _ in parts)
+    df, mapping = align(parts)
+    final = int(df.memory_usage(index=True, deep=True).sum())
+    report = IngestReport(rows=len(df), seconds=time.perf_counter() - t0, peak_bytes=max(peak, held + final),
+                          final_bytes=final, chunks=len(parts))
+    name = f"Workspace ({len(files)} file{'s' if len(files) != 1 else ''}, {len(parts)} sheet{'s' if len(parts) != 1 else ''})"
+    dataset = Dataset(df, mapping, digest=digest, name=name, report=report)
+    dataset.sources, dataset.skipped = sources, skipped
+    progress.check()
+    progress.update(phase="Building aggregates")
+    dataset.cube
+    return dataset
@@ -0,0 +1,56 @@
+"""Parse cache accounting: structures built after an item is stored count against the budget."""
+import numpy as np
+import pandas as pd
+
+from engine.cache import ParseCache
+from engine.dataset import Dataset
+from engine.preview import value_index
+from engine.search import PassageIndex
+
+
+def _dataset(n=50_000):
+    df = pd.DataFrame({"Project": pd.Categorical([f"P{i % 40}" for i in range(n)]),
+                       "Amount": np.arange(n, dtype="float64"),
+                       "Date": pd.date_range("2024-01-01", periods=n, freq="h").strftime("%Y-%m-%d")})
+    return Dataset(df, ("Amount", "Project", "Date", None), digest="d1")
+
+
+def test_derived_structures_are_charged():
+    ds = _dataset()
+    cache = ParseCache(budget_mb=64)
+    cache.put("d1", ds)
+    stored = cache.used
+    assert stored == ds.nbytes
+    ds.dates
+    value_index(ds, "Project")
+    assert cache.used > stored
+    assert cache.used == ds.nbytes
+
+
+def test_growth_evicts_to_stay_in_budget():
+    old, ds = _dataset(), _dataset()
+    cache = ParseCache(budget_mb=(old.nbytes + ds.nbytes) / 1024 / 1024 + 0.05)
+    cache.put("old", old)
+    cache.put("d1", ds)
+    assert len(cache) == 2
+    ds.cube
+    assert "old" not in cache and "d1" in cache
+    assert cache.used == ds.nbytes <= cache.budget
+
+
+def test_evicted_item_no_longer_charges():
+    ds = _dataset()
+    cache = ParseCache(budget_mb=64)
+    cache.put("d1", ds)
+    cache.clear()
+    ds.cube
+    assert cache.used == 0
+
+
+def test_passage_index_size_is_tracked_incrementally():
+    index = PassageIndex("doc")
+    added = index.add_page(0, "Total spend\nTata Trust grant received\n\n")
+    added += index.add_page(1, "spend spend spend")
+    assert added == index.nbytes
+    pids = sum(len(p) * p.itemsize + len(t) * t.itemsize for p, t in zip(index._pids.values(), index._tfs.values()))
+    assert index.nbytes == 12 * len(index) + sum(map(len, index.texts)) + pids
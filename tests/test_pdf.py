@@ -0,0 +1,49 @@
+"""PDF extraction: failed page ranges are reported and never left in the cache."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.synth import write_pdf
+from engine import pdf
+from engine.cache import ParseCache
+
+
+@pytest.fixture
+def pdf_bytes(tmp_path):
+    path = tmp_path / "report.pdf"
+    write_pdf(str(path), 12, lines_per_page=5)
+    return path.read_bytes()
+
+
+@pytest.fixture
+def failing_first_range(monkeypatch):
+    extract = pdf.extract_pages
+
+    def flaky(path, start, stop):
+        if start == 0:
+            raise ValueError("broken xref")
+        return extract(path, start, stop)
+    monkeypatch.setattr(pdf, "extract_pages", flaky)
+    monkeypatch.setattr(pdf, "_executor", lambda n: ThreadPoolExecutor(max_workers=1))
+
+
+def test_failed_pages_are_reported(pdf_bytes, failing_first_range, request):
+    cache = ParseCache()
+    digest = request.node.name
+    doc = cache.get_or_parse(digest, lambda: pdf.PdfDocument(pdf_bytes, digest, "report.pdf"))
+    assert doc.wait(30)
+    assert doc.failed == list(range(pdf.PAGES_PER_TASK))
+    assert isinstance(doc.error, ValueError)
+    assert digest not in cache
+    reply = pdf.answer([doc], "grant")
+    assert f"{pdf.PAGES_PER_TASK} of 12 pages could not be read" in reply
+
+
+def test_complete_document_stays_cached(pdf_bytes, monkeypatch, request):
+    monkeypatch.setattr(pdf, "_executor", lambda n: ThreadPoolExecutor(max_workers=1))
+    cache = ParseCache()
+    digest = request.node.name
+    doc = cache.get_or_parse(digest, lambda: pdf.PdfDocument(pdf_bytes, digest, "report.pdf"))
+    assert doc.wait(30) and not doc.failed
+    assert cache.get(digest) is doc
+    assert cache.used == doc.nbytes > len(pdf_bytes)
@@ -0,0 +1,78 @@
+"""AI Analyst question parsing and answers, on the in-memory and the columnar engine."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import columnar
+from engine.dataset import Dataset
+from engine.query import answer, parse_question, run_plan
+
+N = 365
+
+
+def _ledger():
+    days = pd.date_range("2024-01-01", periods=N, freq="D")
+    return pd.DataFrame({"Date": days.strftime("%Y-%m-%d"),
+                         "Project": pd.Categorical([f"Proj {i % 6}" for i in range(N)]),
+                         "Head": pd.Categorical(np.array(["Marketing", "Training", "Travel"])[np.arange(N) % 3]),
+                         "Spend": (np.arange(N) % 50 + 1) * 100.0})
+
+
+@pytest.fixture(params=["pandas", "columnar"])
+def dataset(request, tmp_path, monkeypatch):
+    df = _ledger()
+    mapping = ("Spend", "Project", "Date", None)
+    if request.param == "pandas":
+        return Dataset(df, mapping, digest="q-pandas")
+    if not columnar.available():
+        pytest.skip("duckdb not installed")
+    monkeypatch.setattr(columnar, "STORE_DIR", str(tmp_path))
+    return columnar.load_columnar("ledger.csv", df.to_csv(index=False).encode(), f"q-columnar-{tmp_path.name}")
+
+
+def test_top_n_by_amount_groups_by_category(dataset):
+    plan = parse_question(dataset, "top 3 projects by spend")
+    assert (plan.group_by, plan.top_n, plan.agg, plan.ascending) == ("Project", 3, "sum", False)
+    groups = run_plan(dataset, plan)["groups"]
+    expected = _ledger().groupby("Project", observed=True)["Spend"].sum().nlargest(3)
+    assert list(groups.index) == list(expected.index)
+
+
+def test_by_date_groups_by_day():
+    ds = Dataset(_ledger(), ("Spend", "Project", "Date", None), digest="q-by-date")
+    plan = parse_question(ds, "spend by date")
+    assert (plan.group_by, plan.period) == ("Date", "D")
+
+
+@pytest.mark.parametrize("question,start,end", [
+    ("spend in the last 3 months", "2024-09-30", "2024-12-30"),
+    ("total for the past 2 weeks", "2024-12-17", "2024-12-30"),
+    ("spend in the first 2 months", "2024-01-01", "2024-02-29"),
+])
+def test_relative_periods_are_date_ranges(dataset, question, start, end):
+    plan = parse_question(dataset, question)
+    assert plan.top_n is None and plan.group_by is None
+    dates = pd.to_datetime(_ledger()["Date"])
+    inside = (dates >= plan.date_from) & (dates <= plan.date_to)
+    assert dates[inside].min() == pd.Timestamp(start) and dates[inside].max() == pd.Timestamp(end)
+    assert run_plan(dataset, plan)["value"] == _ledger()["Spend"][inside].sum()
+
+
+def test_last_n_without_period_is_still_bottom_n(dataset):
+    plan = parse_question(dataset, "last 2 projects")
+    assert (plan.top_n, plan.ascending, plan.date_from) == (2, True, None)
+
+
+@pytest.mark.parametrize("question,month", [
+    ("spend in march 2024", 3), ("spend in Mar. 2024", 3), ("spend for sept 2024", 9), ("june 2024 total", 6)])
+def test_month_names(dataset, question, month):
+    plan = parse_question(dataset, question)
+    assert (plan.date_from.year, plan.date_from.month) == (2024, month)
+    assert plan.date_to.month == month
+
+
+def test_words_starting_with_a_month_are_not_months(dataset):
+    plan = parse_question(dataset, "spending on marketing 2024")
+    assert (plan.date_from, plan.date_to) == (pd.Timestamp("2024-01-01"), pd.Timestamp("2025-01-01") - pd.Timedelta(1, "ns"))
+    assert plan.filters == (("Head", ("Marketing",)),)
+    assert "No records" not in answer(dataset, "spending on marketing 2024")
@@ -0,0 +1,112 @@
+"""Column auto-mapping: parity with the original keyword rules, and currency detection."""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.ingest import read_table
+from engine.schema import auto_map_columns, infer_schema
+
+N = 200
+
+
+def baseline_map(df):
+    """The keyword rules auto_map_columns replaced (app.py before the schema profiler)"""
+    cols = list(df.columns)
+    amt = next((c for c in cols if any(x in c.lower() for x in ['spend', 'amount', 'cost', 'total', 'budget'])), None)
+    if not amt:
+        nums = df.select_dtypes(include=['number']).columns
+        amt = nums[0] if len(nums) else None
+    cat = next((c for c in cols if any(x in c.lower() for x in ['project', 'donor', 'name', 'activity'])), None)
+    if not cat:
+        for t in df.select_dtypes(include=['object', 'string']).columns:
+            if 'status' not in t.lower() and 'date' not in t.lower():
+                cat = t
+                break
+    if not cat and cols:
+        cat = cols[0]
+    date = next((c for c in cols if any(x in c.lower() for x in ['date', 'time', 'year', 'month'])), None)
+    status = next((c for c in cols if 'status' in c.lower()), None)
+    return amt, cat, date, status
+
+
+def _frame(**cols):
+    return pd.DataFrame({k: v[:N] for k, v in cols.items()})
+
+
+i = np.arange(N)
+LEDGERS = {
+    "monthly spend vs head count": _frame(**{
+        "Beneficiaries": i % 37 + 5, "Total Monthly Spend": i * 100.5, "Project": [f"P{k % 7}" for k in i]}),
+    "no category words": _frame(**{
+        "Region": [f"R{k % 13}" for k in i], "Sector": [f"S{k % 3}" for k in i],
+        "Beneficiaries": i % 37, "Total Monthly Spend": i * 1.5}),
+    "magic bus ledger": _frame(**{
+        "Txn Date": pd.date_range("2024-01-01", periods=N).strftime("%d-%m-%Y"), "Project Name": [f"P{k % 9}" for k in i],
+        "Donor": [f"D{k % 4}" for k in i], "Amount Spent": i * 250.0,
+        "Status": np.array(["Paid", "Pending", "Approved"])[i % 3]}),
+    "budget before amount": _frame(**{
+        "Activity": [f"A{k % 5}" for k in i], "Budget": i * 10.0, "Amount": i * 7.0, "Year": 2020 + i % 4}),
+    "extra amount word after a keyword": _frame(**{
+        "Grant Received": i * 3.0, "Cost": i * 2.0, "Donor": [f"D{k % 4}" for k in i]}),
+    "unnamed numbers": _frame(**{
+        "Head Count": i % 11, "Location": [f"L{k % 6}" for k in i], "Reading": i * 0.5}),
+    "currency text amount": _frame(**{
+        "Vendor": [f"V{k % 8}" for k in i], "Total": [f"₹{k * 1000:,}" for k in i],
+        "Payment Status": np.array(["Paid", "Unpaid"])[i % 2]}),
+}
+
+
+@pytest.mark.parametrize("name", list(LEDGERS))
+def test_mapping_matches_baseline_keywords(name):
+    df = LEDGERS[name]
+    amt, cat, date, status = auto_map_columns(df)
+    b_amt, b_cat, b_date, b_status = baseline_map(df)
+    assert (amt, cat, status) == (b_amt, b_cat, b_status)
+    # The baseline could pick the amount column as the date too ('Total Monthly Spend')
+    assert date == (b_date if b_date != b_amt else None)
+
+
+def test_amount_word_beats_unnamed_numeric():
+    df = _frame(**{"Beneficiaries": i % 37 + 5, "Disbursed": i * 10.0, "Location": [f"L{k % 6}" for k in i]})
+    assert auto_map_columns(df)[0] == "Disbursed"
+
+
+def test_year_column_is_not_an_amount():
+    df = _frame(**{"Year": 2020 + i % 4, "Readings": i * 0.5, "Location": [f"L{k % 6}" for k in i]})
+    assert auto_map_columns(df)[0] == "Readings"
+
+
+def test_only_amount_and_money_formatted_columns_are_converted():
+    df = _frame(**{"Project": [f"P{k % 7}" for k in i],
+                   "Cheque No": [str(100000 + k) if k % 20 else "CASH" for k in i],
+                   "Grant Code": [str(k % 50) if k % 30 else "7A" for k in i],
+                   "Amount": [f"₹{k * 1000:,}" for k in i],
+                   "Fee": [f"Rs. {k:,}/-" for k in i]})
+    assert sorted(infer_schema(df).currency_columns) == ["Amount", "Fee"]
+
+
+@pytest.mark.parametrize("chunk_rows", [7, 1_000])
+def test_unparseable_values_keep_their_text(chunk_rows):
+    src = _frame(**{"Project": [f"P{k % 7}" for k in i],
+                    "Cheque No": [str(100000 + k) if k % 20 else "CASH" for k in i],
+                    "Amount": [f"₹{k * 1000:,}" if k != 150 else "pending" for k in i],
+                    "Sanctioned": [f"Rs. {k * 10:,}/-" if k != 190 else "TBD" for k in i],
+                    "Fee": [f"({k:,})" for k in i]})
+    df, mapping, report = read_table("ledger.csv", src.to_csv(index=False).encode(), chunk_rows=chunk_rows)
+    assert mapping[0] == "Amount"
+    assert df["Cheque No"].astype(str).tolist() == src["Cheque No"].tolist()
+    assert df["Sanctioned"].astype(str).tolist() == src["Sanctioned"].tolist()
+    assert df["Fee"].tolist() == [-k for k in i]
+    assert np.isnan(df["Amount"][150]) and df["Amount"][149] == 149_000
+    assert report.unparsed == 1
+
+
+def test_excel_keeps_unparseable_text():
+    src = _frame(**{"Project": [f"P{k % 7}" for k in i], "Amount": i * 10.0,
+                    "Sanctioned": [f"Rs. {k * 10:,}/-" if k != 3 else "TBD" for k in i]})
+    buf = io.BytesIO()
+    src.to_excel(buf, index=False)
+    df, _, _ = read_table("ledger.xlsx", buf.getvalue())
+    assert df["Sanctioned"].astype(str).tolist() == src["Sanctioned"].tolist()